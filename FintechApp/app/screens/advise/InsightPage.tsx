@@ -5,6 +5,7 @@ import { Text } from 'react-native-paper';
 import AsyncStorage from '@react-native-async-storage/async-storage';
 import Markdown from 'react-native-markdown-display';
 import { LineChart } from 'react-native-chart-kit';
+import { fetchJsonWithETag } from '../../services/api';
 
 const markdownStyles = {
     body:         { color: '#333', fontSize: 16, lineHeight: 22 },
@@ -55,8 +56,7 @@ const InsightPage = () => {
       try {
         const userId = await AsyncStorage.getItem('userId');
         if (userId) {
-          const hRes  = await fetch(`http://127.0.0.1:8000/api/history/${userId}`);
-          const hJson = await hRes.json();
+          const { data: hJson } = await fetchJsonWithETag(`http://127.0.0.1:8000/api/history/${userId}/?bucket=day`);
           setHistory(hJson.history ?? []);
         }
       } catch (err) {
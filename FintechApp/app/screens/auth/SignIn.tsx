@@ -28,6 +28,8 @@ export default function SignInScreen() {
 
     if (response.ok) {
       await AsyncStorage.setItem('userId', data.userId);
+      await AsyncStorage.setItem('accessToken', data.access);
+      await AsyncStorage.setItem('refreshToken', data.refresh);
       await new Promise(res => setTimeout(res, 100)); // small manual delay
       router.replace('/screens/credit/Estimator');
     } else {
@@ -13,6 +13,7 @@ import AsyncStorage from '@react-native-async-storage/async-storage';
 import { LineChart } from 'react-native-chart-kit';
 import { Dimensions } from 'react-native';
 import { TextInput, Button } from 'react-native-paper';
+import { authFetch } from '../../services/api';
 
 interface Prediction {
   creditLimit: number;
@@ -111,7 +112,7 @@ const CreditEstimator = () => {
     //     console.error('[FRONTEND] userId is null — cannot proceed with request');
     //     return;
     //   }
-      const response = await fetch(`${baseURL}/api/estimate/`, {
+      const response = await authFetch(`${baseURL}/api/estimate/`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
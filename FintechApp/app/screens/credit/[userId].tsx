@@ -10,6 +10,7 @@ import {
 import { useLocalSearchParams } from 'expo-router';
 import { LineChart } from 'react-native-chart-kit';
 import { Dimensions } from 'react-native';
+import { fetchJsonWithETag } from '../../services/api';
 
 interface CreditDetails {
   creditLimit: number;
@@ -34,10 +35,9 @@ const UserCreditDetails = () => {
           default: 'http://127.0.0.1:8000',
         });
 
-        const response = await fetch(`${baseURL}/api/history/${userId}/`);
-        const data = await response.json();
+        const { ok, data } = await fetchJsonWithETag(`${baseURL}/api/history/${userId}/?bucket=day`);
 
-        if (response.ok) {
+        if (ok) {
           setCreditDetails({
             creditLimit: data.latest?.creditLimit || 0,
             approvalProbability: data.latest?.approvalProbability || 0,
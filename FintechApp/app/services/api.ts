@@ -1,4 +1,5 @@
 import axios from 'axios';
+import AsyncStorage from '@react-native-async-storage/async-storage';
 
 // Use the tunnel URL when running on a physical device
 const API_BASE_URL = __DEV__ 
@@ -57,4 +58,67 @@ export const getApprovalProbability = async (data: {
     console.error('Error getting approval probability:', error);
     throw error;
   }
-}; 
\ No newline at end of file
+};
+
+// fetch() with the stored access token. Access tokens expire after 15
+// minutes: on a 401 the stored refresh token is traded for a new pair at
+// /api/token/refresh/ and the request is retried once. If the refresh fails
+// too, the tokens are dropped and the request is retried as a guest.
+export const authFetch = async (url: string, init: RequestInit = {}) => {
+  const send = (token: string | null) => {
+    const headers = new Headers(init.headers);
+    if (token) {
+      headers.set('Authorization', `Bearer ${token}`);
+    }
+    return fetch(url, { ...init, headers });
+  };
+
+  const accessToken = await AsyncStorage.getItem('accessToken');
+  const response = await send(accessToken);
+  if (response.status !== 401 || !accessToken) {
+    return response;
+  }
+
+  const origin = url.match(/^https?:\/\/[^/]+/)?.[0] ?? '';
+  const refreshToken = await AsyncStorage.getItem('refreshToken');
+  if (refreshToken) {
+    const refreshed = await fetch(`${origin}/api/token/refresh/`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ refresh: refreshToken }),
+    });
+    if (refreshed.ok) {
+      const tokens = await refreshed.json();
+      await AsyncStorage.setItem('accessToken', tokens.access);
+      await AsyncStorage.setItem('refreshToken', tokens.refresh);
+      return send(tokens.access);
+    }
+  }
+  await AsyncStorage.multiRemove(['accessToken', 'refreshToken']);
+  return send(null);
+};
+
+// GET a JSON body, revalidating a stored copy with its ETag. The backend
+// answers an unchanged /api/history/ or /api/summary/ with an empty 304, so
+// the last body is reused instead of downloading it again.
+export const fetchJsonWithETag = async (url: string, init: RequestInit = {}) => {
+  const key = `etag:${url}`;
+  const stored = await AsyncStorage.getItem(key);
+  const cached = stored ? JSON.parse(stored) as { etag: string; data: any } : null;
+
+  const headers = new Headers(init.headers);
+  if (cached) {
+    headers.set('If-None-Match', cached.etag);
+  }
+  const response = await fetch(url, { ...init, headers });
+  if (response.status === 304 && cached) {
+    return { ok: true, status: 200, data: cached.data };
+  }
+
+  const data = await response.json();
+  const etag = response.headers.get('ETag');
+  if (response.ok && etag) {
+    await AsyncStorage.setItem(key, JSON.stringify({ etag, data }));
+  }
+  return { ok: response.ok, status: response.status, data };
+};
@@ -0,0 +1,13 @@
+import os
+from django.core.asgi import get_asgi_application
+
+# point to your settings module
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "banking_backend.settings")
+
+# the ASGI callable for uvicorn/daphne; the chatbot and insight views are async
+# and only get a long-lived event loop (and pooled Gemini connections) here
+application = get_asgi_application()
+
+# load and warm the models now rather than on the first request
+from core.startup import warm_up  # noqa: E402
+warm_up()
@@ -1,11 +1,21 @@
 import os
-import mongoengine
 from pathlib import Path
 from dotenv import load_dotenv
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 load_dotenv(BASE_DIR / ".env") 
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+GEMINI_BASE_URL = os.getenv('GEMINI_BASE_URL', 'https://generativelanguage.googleapis.com/v1beta')
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.0-flash')
+# one pooled async client serves /api/chatbot/ and /api/insight/
+GEMINI_CONNECT_TIMEOUT = float(os.getenv('GEMINI_CONNECT_TIMEOUT', '3'))
+GEMINI_READ_TIMEOUT = float(os.getenv('GEMINI_READ_TIMEOUT', '30'))
+GEMINI_MAX_CONNECTIONS = int(os.getenv('GEMINI_MAX_CONNECTIONS', '20'))
+GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', '16'))
+GEMINI_MAX_RETRIES = int(os.getenv('GEMINI_MAX_RETRIES', '2'))
+# /api/insight/ replies cached by prompt hash; a size of 0 disables caching
+INSIGHT_CACHE_SIZE = int(os.getenv('INSIGHT_CACHE_SIZE', '1000'))
+INSIGHT_CACHE_TTL = float(os.getenv('INSIGHT_CACHE_TTL', '3600'))
 
 # BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 
@@ -13,10 +23,29 @@ MONGO_USER = os.getenv("MONGO_DB_USER")
 MONGO_PASS = os.getenv("MONGO_DB_PASS")
 DB_NAME    = os.getenv("DB_NAME")
 MONGODB_URI = os.getenv("MONGODB_URI")
+# registered by core.db at startup; each process connects on its first query
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
 
 DEBUG = os.getenv("DEBUG", "False") == "True"
 ALLOWED_HOSTS = ["localhost", "127.0.0.1", "[::1]", "10.165.172.169"]
 
+# ─── Auth ───
+SECRET_KEY = os.getenv("DJANGO_SECRET_KEY")
+if not SECRET_KEY:
+    if not DEBUG:
+        from django.core.exceptions import ImproperlyConfigured
+        raise ImproperlyConfigured("DJANGO_SECRET_KEY must be set when DEBUG is off")
+    SECRET_KEY = "django-insecure-dev-only-key"
+# access/refresh tokens from /api/signin/ are HS256-signed with this key;
+# lifetimes are in seconds
+JWT_SIGNING_KEY = os.getenv("JWT_SIGNING_KEY", SECRET_KEY)
+JWT_ALGORITHM = "HS256"
+JWT_ACCESS_TOKEN_LIFETIME = int(os.getenv("JWT_ACCESS_TOKEN_LIFETIME", "900"))
+JWT_REFRESH_TOKEN_LIFETIME = int(os.getenv("JWT_REFRESH_TOKEN_LIFETIME", str(14 * 24 * 3600)))
+# when on, views that act for a user ignore a client-supplied userId and
+# require a bearer token; off keeps guest estimates working
+AUTH_REQUIRE_TOKEN = os.getenv("AUTH_REQUIRE_TOKEN", "False") == "True"
+
 INSTALLED_APPS = [
     "django.contrib.contenttypes",
     "django.contrib.staticfiles",
@@ -25,8 +54,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.metrics.MetricsMiddleware",  # first, so it times everything below
     "corsheaders.middleware.CorsMiddleware",  # Add CORS middleware
     "django.middleware.common.CommonMiddleware",
+    "core.auth.JWTAuthenticationMiddleware",
 ]
 
 # CORS settings
@@ -54,18 +85,23 @@ CORS_ALLOW_HEADERS = [
     "authorization",
     "content-type",
     "dnt",
+    "if-none-match",
     "origin",
     "user-agent",
     "x-csrftoken",
     "x-requested-with",
 ]
 
+# the app keeps /api/history/ and /api/summary/ bodies by ETag and revalidates
+CORS_EXPOSE_HEADERS = ["etag"]
+
 # Allow all origins in development
 if DEBUG:
     CORS_ALLOW_ALL_ORIGINS = True
 
 ROOT_URLCONF = "banking_backend.urls"
 WSGI_APPLICATION = "banking_backend.wsgi.application"
+ASGI_APPLICATION = "banking_backend.asgi.application"
 
 # ─── MongoDB Connection ──────────────────────────────────
 # settings.py
@@ -93,7 +129,61 @@ DATABASES = {
 # minimal static config
 STATIC_URL = "/static/"
 
-mongoengine.connect(
-    db=os.getenv("DB_NAME"),
-    host=os.getenv("MONGODB_URI"),
+# ─── Inference ───────────────────────────────────────────
+MODEL_DIR = BASE_DIR / "core" / "MLModel"
+# compiled forests are cached here as .npy files and memory-mapped read-only,
+# so every worker process shares one copy of the tree arrays
+MODEL_CACHE_DIR = Path(os.getenv("MODEL_CACHE_DIR", MODEL_DIR / ".compiled"))
+# retrained bundles live in MODEL_VERSIONS_DIR/<name>/; MLModel/ itself is the
+# "default" version. Workers pick up an activation within the poll interval.
+MODEL_VERSIONS_DIR = Path(os.getenv("MODEL_VERSIONS_DIR", MODEL_DIR / "versions"))
+MODEL_REGISTRY_POLL_SECONDS = float(os.getenv("MODEL_REGISTRY_POLL_SECONDS", "2"))
+# the wsgi/asgi entrypoints load and warm the active version before serving
+# (before the fork under gunicorn's preload_app); off defers it to the first request
+MODEL_WARM_UP = os.getenv("MODEL_WARM_UP", "True") == "True"
+# shared secret for /api/admin/models/ (X-Admin-Token header); unset disables it
+MODEL_ADMIN_TOKEN = os.getenv("MODEL_ADMIN_TOKEN")
+
+# concurrent single-row predictions are coalesced into one batch of at most
+# INFERENCE_MAX_BATCH_SIZE rows, waiting no longer than INFERENCE_MAX_WAIT_MS
+# for the batch to fill; a batch size of 1 disables batching
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "32"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "2"))
+
+# LRU+TTL cache of model outputs keyed on the encoded features and model
+# version; a size of 0 disables it
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "300"))
+
+# /api/estimate/ queues its Prediction documents and a background thread
+# writes them with insert_many every PREDICTION_WRITE_BATCH_SIZE documents or
+# PREDICTION_WRITE_FLUSH_SECONDS, whichever comes first. At most
+# PREDICTION_WRITE_MAX_PENDING documents are buffered (0 writes synchronously);
+# batches that still fail after the retries are appended to the dead-letter file.
+PREDICTION_WRITE_BATCH_SIZE = int(os.getenv("PREDICTION_WRITE_BATCH_SIZE", "500"))
+PREDICTION_WRITE_FLUSH_SECONDS = float(os.getenv("PREDICTION_WRITE_FLUSH_SECONDS", "0.5"))
+PREDICTION_WRITE_MAX_PENDING = int(os.getenv("PREDICTION_WRITE_MAX_PENDING", "10000"))
+PREDICTION_WRITE_MAX_RETRIES = int(os.getenv("PREDICTION_WRITE_MAX_RETRIES", "3"))
+PREDICTION_DEAD_LETTER_PATH = os.getenv(
+    "PREDICTION_DEAD_LETTER_PATH", str(BASE_DIR / "prediction_dead_letter.jsonl")
 )
+
+# /api/history/ page size (?limit=) default and cap
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "100"))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "1000"))
+
+# /api/history/ and /api/summary/ bodies of at least this many bytes are
+# brotli (when the brotli package is installed) or gzip compressed
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+
+# /api/users/ page size (?limit=) default and cap, and documents fetched per
+# round trip by the ?format=ndjson export
+USERS_PAGE_SIZE = int(os.getenv("USERS_PAGE_SIZE", "100"))
+USERS_MAX_PAGE_SIZE = int(os.getenv("USERS_MAX_PAGE_SIZE", "1000"))
+USERS_EXPORT_BATCH_SIZE = int(os.getenv("USERS_EXPORT_BATCH_SIZE", "1000"))
+
+# ─── Metrics ───
+# /metrics serves Prometheus text; with METRICS_SERVER_TIMING on, responses
+# carry a Server-Timing header with the request's stage/Mongo/Gemini times
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True") == "True"
+METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "False") == "True"
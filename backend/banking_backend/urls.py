@@ -1,11 +1,13 @@
 from django.urls import path, include
 from django.http import HttpResponse
-from core.views import credit_estimate, list_users, limit_view, approval_view, user_setup
+from core.views import credit_estimate, list_users, limit_view, approval_view, user_setup, metrics_view, readiness
 
 def index(request):
     return HttpResponse("Welcome to FinTech API!")
 
 urlpatterns = [
     path('api/', include('core.urls')),  # ✅ this is good
+    path('metrics', metrics_view, name='metrics'),
+    path('healthz/ready', readiness, name='readiness'),
     path('', index, name='index'),
 ]
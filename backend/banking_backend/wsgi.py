@@ -6,3 +6,7 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "banking_backend.settings")
 
 # this is the WSGI callable Django’s dev server and any WSGI server will use
 application = get_wsgi_application()
+
+# load and warm the models now rather than on the first request
+from core.startup import warm_up  # noqa: E402
+warm_up()
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    name = 'core'
+
+    def ready(self):
+        # records the Mongo settings only; each process connects on first use
+        from . import db
+        db.register()
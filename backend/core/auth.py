@@ -0,0 +1,175 @@
+# core/auth.py
+"""Stateless JWT sessions for ``UserProfile`` accounts.
+
+``signin_view`` issues a short-lived access token and a longer-lived refresh
+token, both HS256-signed with ``JWT_SIGNING_KEY``.  The access token carries
+the profile fields the screens use (email, education, income, marital status,
+dependents), so ``JWTAuthenticationMiddleware`` can authenticate a request and
+views can read the profile from ``request.auth_claims`` without a
+``user_profiles`` lookup.  Only ``/api/token/refresh/`` reads the database, to
+pick up profile changes.
+
+Passwords are stored with Django's configured hasher (PBKDF2 by default);
+the hashing is deliberately slow, so views run it through ``asyncio.to_thread``.
+"""
+import asyncio
+import hmac
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import jwt
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+from django.http import JsonResponse
+
+ACCESS = 'access'
+REFRESH = 'refresh'
+
+# UserProfile fields copied into access tokens
+PROFILE_CLAIMS = ('dependent_count', 'education_level', 'income_category', 'marital_status')
+
+
+class TokenError(Exception):
+    """The token is missing, malformed, expired or of the wrong type."""
+
+
+def _encode(claims, token_type, lifetime):
+    now = datetime.now(timezone.utc)
+    payload = {
+        **claims,
+        'typ': token_type,
+        'iat': now,
+        'exp': now + timedelta(seconds=lifetime),
+        'jti': uuid.uuid4().hex,
+    }
+    return jwt.encode(payload, settings.JWT_SIGNING_KEY, algorithm=settings.JWT_ALGORITHM)
+
+
+def profile_claims(user):
+    """Claims describing ``user`` (a ``UserProfile``)."""
+    claims = {'sub': str(user.id), 'email': user.email}
+    claims['profile'] = {field: getattr(user, field) for field in PROFILE_CLAIMS}
+    return claims
+
+
+def issue_tokens(user):
+    claims = profile_claims(user)
+    return {
+        'access': _encode(claims, ACCESS, settings.JWT_ACCESS_TOKEN_LIFETIME),
+        # refresh tokens only identify the user; the profile is re-read on refresh
+        'refresh': _encode({'sub': claims['sub']}, REFRESH, settings.JWT_REFRESH_TOKEN_LIFETIME),
+    }
+
+
+def decode_token(token, token_type=ACCESS):
+    """Verify ``token`` and return its claims, or raise ``TokenError``."""
+    try:
+        claims = jwt.decode(
+            token,
+            settings.JWT_SIGNING_KEY,
+            algorithms=[settings.JWT_ALGORITHM],
+            options={'require': ['sub', 'typ', 'exp']},
+        )
+    except jwt.ExpiredSignatureError:
+        raise TokenError('Token expired')
+    except jwt.InvalidTokenError as e:
+        raise TokenError(f'Invalid token: {e}')
+    if claims['typ'] != token_type:
+        raise TokenError(f'Wrong token type (expected {token_type})')
+    return claims
+
+
+# — passwords —
+
+def _is_hashed(encoded):
+    try:
+        identify_hasher(encoded)
+        return True
+    except ValueError:
+        return False
+
+
+def verify_password(password, user):
+    """Check ``password`` against ``user.password``.
+
+    Accounts created before hashing still hold the plaintext; a correct
+    password re-saves them hashed.  Blocking: call it via ``to_thread``.
+    """
+    if _is_hashed(user.password):
+        def upgrade(raw):
+            user.password = make_password(raw)
+            user.save()
+        return check_password(password, user.password, setter=upgrade)
+
+    if not hmac.compare_digest(user.password.encode(), password.encode()):
+        return False
+    user.password = make_password(password)
+    user.save()
+    return True
+
+
+async def hash_password(password):
+    return await asyncio.to_thread(make_password, password)
+
+
+# — middleware —
+
+class JWTAuthenticationMiddleware:
+    """Authenticate ``Authorization: Bearer <access token>`` from the token alone.
+
+    Sets ``request.auth_claims`` (``None`` for anonymous requests) and
+    ``request.auth_user_id``.  A present but invalid token is rejected with
+    401 rather than treated as anonymous.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        rejected = self._authenticate(request)
+        return rejected or self.get_response(request)
+
+    async def __acall__(self, request):
+        rejected = self._authenticate(request)
+        return rejected or await self.get_response(request)
+
+    def _authenticate(self, request):
+        request.auth_claims = None
+        request.auth_user_id = None
+        header = request.headers.get('Authorization', '')
+        if not header:
+            return None
+        scheme, _, token = header.partition(' ')
+        if scheme.lower() != 'bearer' or not token:
+            return JsonResponse({'error': 'Expected "Authorization: Bearer <token>"'}, status=401)
+        try:
+            claims = decode_token(token.strip(), ACCESS)
+        except TokenError as e:
+            return JsonResponse({'error': str(e)}, status=401)
+        request.auth_claims = claims
+        request.auth_user_id = claims['sub']
+        return None
+
+
+def resolve_user_id(request, claimed=None):
+    """The user a request acts for.
+
+    With a token that is the token's subject, and a different ``claimed`` id
+    (from the body or URL) is refused.  Without one the claimed id is trusted
+    unless ``AUTH_REQUIRE_TOKEN`` is on.  Raises ``PermissionError``.
+    """
+    token_user = getattr(request, 'auth_user_id', None)
+    if token_user:
+        if claimed and claimed != token_user:
+            raise PermissionError('Token does not match userId')
+        return token_user
+    if settings.AUTH_REQUIRE_TOKEN:
+        raise PermissionError('Authentication required')
+    return claimed
@@ -0,0 +1,162 @@
+# core/batching.py
+"""Coalesce concurrent single-row predictions into batched model calls.
+
+Request threads hand their encoded feature vector to a ``MicroBatcher`` and
+block; one worker thread collects vectors until ``max_batch_size`` is reached
+or ``max_wait_ms`` has passed since the first one arrived, runs the model once
+on the stacked batch and hands every caller its own row of the result.
+
+A row that finds nothing else queued runs at once: waiting only pays off when
+other requests are already arriving.  Under load, rows queue up while the
+worker is busy and the next round batches them, so a lone request (or one
+whose views are serialised onto a single thread) never pays ``max_wait_ms``.
+"""
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import numpy as np
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """Queue feature vectors and flush them through ``predict_fn`` in batches.
+
+    ``predict_fn`` takes a 2-D array and returns one result per row.  With
+    ``max_batch_size <= 1`` batching is disabled and ``submit`` calls
+    ``predict_fn`` directly on the calling thread.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=2.0,
+                 timeout=5.0, name='batcher'):
+        self.predict_fn = predict_fn
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait_ms = float(max_wait_ms)
+        self.timeout = timeout
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._queue = None
+        self._worker = None
+        self._pid = None
+        self._closed = False
+
+        self._batches = 0
+        self._rows = 0
+        self._max_queue_depth = 0
+        self._sizes = Counter()
+        self._stats_lock = threading.Lock()
+
+    # — public API —
+
+    def submit(self, x):
+        """Predict one encoded row, blocking until its batch has run."""
+        if self.max_batch_size <= 1:
+            return self._predict_inline(x)
+
+        with self._lock:
+            # checked under the lock so no row is queued behind close()'s stop marker
+            if self._closed:
+                future = None
+            else:
+                future = Future()
+                self._ensure_worker().put((np.asarray(x).ravel(), future))
+        if future is None:
+            return self._predict_inline(x)
+        return future.result(timeout=self.timeout)
+
+    def close(self):
+        """Stop the worker once queued rows are done; later submits run inline."""
+        with self._lock:
+            self._closed = True
+            if self._queue is not None and self._pid == os.getpid():
+                self._queue.put(_STOP)
+
+    def stats(self):
+        q = self._queue
+        with self._stats_lock:
+            return {
+                'name': self.name,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait_ms,
+                'queue_depth': q.qsize() if q is not None else 0,
+                'max_queue_depth': self._max_queue_depth,
+                'batches': self._batches,
+                'rows': self._rows,
+                'mean_batch_size': round(self._rows / self._batches, 3) if self._batches else 0.0,
+                'batch_size_histogram': {str(k): v for k, v in sorted(self._sizes.items())},
+            }
+
+    # — worker —
+
+    def _predict_inline(self, x):
+        self._record(1, 0)
+        return self.predict_fn(np.asarray(x).reshape(1, -1))[0]
+
+    def _ensure_worker(self):
+        # called with self._lock held; a forked child inherits the queue but
+        # not the thread, so it starts a fresh pair
+        if self._worker is None or self._pid != os.getpid():
+            self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._worker = threading.Thread(
+                target=self._run, args=(self._queue,),
+                name=f'{self.name}-microbatcher', daemon=True
+            )
+            self._worker.start()
+        return self._queue
+
+    def _record(self, size, depth):
+        with self._stats_lock:
+            self._batches += 1
+            self._rows += size
+            self._sizes[size] += 1
+            if depth > self._max_queue_depth:
+                self._max_queue_depth = depth
+
+    def _collect(self, q):
+        first = q.get()
+        if first is _STOP:
+            return None, 0
+        batch = [first]
+        depth = q.qsize() + 1
+        if depth == 1:
+            # nobody else is waiting; don't hold this row for company
+            return batch, depth
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    # past the deadline: take whatever is already queued, don't wait
+                    item = q.get_nowait()
+                else:
+                    item = q.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                q.put(_STOP)  # finish this batch, stop on the next round
+                break
+            batch.append(item)
+        return batch, depth
+
+    def _run(self, q):
+        while True:
+            batch, depth = self._collect(q)
+            if batch is None:
+                return
+            futures = [future for _, future in batch]
+            try:
+                results = self.predict_fn(np.stack([x for x, _ in batch]))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+            else:
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+            self._record(len(batch), depth)
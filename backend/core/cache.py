@@ -0,0 +1,166 @@
+# core/cache.py
+"""Bounded in-process caches.
+
+``TTLCache`` is a thread-safe LRU map whose entries also expire after a fixed
+time-to-live.  ``PredictionCache`` keys model outputs on the encoded feature
+vector plus the version of the models that produced them, so a reload can
+never serve a stale prediction.  ``CoalescingCache`` puts a ``TTLCache`` in
+front of an async fetch and lets concurrent misses for one key share a
+single upstream call.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+MISS = object()
+
+
+class TTLCache:
+    """LRU cache with a size cap and per-entry TTL. ``maxsize <= 0`` disables it."""
+
+    def __init__(self, maxsize=1024, ttl=300.0):
+        self.maxsize = int(maxsize)
+        self.ttl = float(ttl)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        """Return the cached value or ``MISS``."""
+        if self.maxsize <= 0:
+            return MISS
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISS
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return MISS
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class PredictionCache(TTLCache):
+    """Model outputs keyed on ``(model version, model kind, feature vector)``."""
+
+    def __init__(self, maxsize=1024, ttl=300.0, version=None):
+        super().__init__(maxsize, ttl)
+        self.version = version
+
+    def set_version(self, version):
+        """Point the cache at a new model version, dropping every old entry."""
+        if version != self.version:
+            self.version = version
+            self.clear()
+
+    def get_or_compute(self, kind, x, compute, version=None):
+        """Return the cached output for encoded vector ``x`` or run ``compute()``.
+
+        Pass the ``version`` of the models ``compute`` uses so a request that
+        started before a reload cannot file its result under the new version.
+        """
+        key = (self.version if version is None else version, kind, tuple(x.tolist()))
+        value = self.get(key)
+        if value is MISS:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def stats(self):
+        stats = super().stats()
+        stats['version'] = self.version
+        return stats
+
+
+class CoalescingCache:
+    """Async get-or-fetch over a ``TTLCache`` with singleflight on misses.
+
+    The first miss for a key starts ``fetch()`` as its own task; concurrent
+    callers for the same key await that task instead of fetching again.
+    Waiters are shielded, so one caller going away does not cancel the fetch
+    the others are waiting on.  Failures are not cached.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300.0):
+        self.cache = TTLCache(maxsize, ttl)
+        self._inflight = {}
+        self.coalesced = 0
+        self.fetches = 0
+
+    async def get_or_fetch(self, key, fetch):
+        value = self.cache.get(key)
+        if value is not MISS:
+            return value
+
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+        # a task from another event loop (WSGI runs each request in its own) can't be shared
+        if task is not None and task.get_loop() is loop and not task.done():
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        self.fetches += 1
+        task = loop.create_task(fetch())
+        self._inflight[key] = task
+
+        def _finish(done):
+            if self._inflight.get(key) is done:
+                del self._inflight[key]
+            if not done.cancelled() and done.exception() is None:
+                self.cache.set(key, done.result())
+
+        task.add_done_callback(_finish)
+        return await asyncio.shield(task)
+
+    def stats(self):
+        stats = self.cache.stats()
+        requests = stats['hits'] + stats['misses']
+        stats.update(
+            coalesced=self.coalesced,
+            upstream_calls=self.fetches,
+            in_flight=len(self._inflight),
+            # share of requests answered without their own upstream call
+            saved_rate=round(1 - self.fetches / requests, 4) if requests else 0.0,
+        )
+        return stats
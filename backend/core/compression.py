@@ -0,0 +1,88 @@
+# core/compression.py
+"""gzip/brotli for large JSON bodies.
+
+``compress_large`` is ``django.views.decorators.gzip.gzip_page`` with a size
+floor and brotli: a response of at least ``RESPONSE_COMPRESS_MIN_BYTES`` is
+compressed with the best coding the client accepts.  Brotli is used when the
+optional ``brotli`` package is installed, gzip otherwise.  Small bodies are
+sent as they are, because compressing them saves a few bytes at best.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only
+    brotli = None
+
+# quality 11 (the default) is meant for static assets; 5 gets most of the
+# size win at a fraction of the CPU, like gzip's level 6 does
+BROTLI_QUALITY = 5
+
+
+def _qualities(header):
+    """``{coding: q}`` from an Accept-Encoding header."""
+    qualities = {}
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding.strip():
+            qualities[coding.strip().lower()] = q
+    return qualities
+
+
+def choose_encoding(header):
+    """``'br'``, ``'gzip'`` or ``None`` for an Accept-Encoding header; brotli wins ties."""
+    qualities = _qualities(header)
+    best, best_q = None, 0.0
+    for coding in (('br',) if brotli is not None else ()) + ('gzip',):
+        q = qualities.get(coding, qualities.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress_response(request, response):
+    """Compress ``response`` in place when it is large enough and the client accepts it."""
+    if response.streaming or response.has_header('Content-Encoding'):
+        return response
+    if len(response.content) < getattr(settings, 'RESPONSE_COMPRESS_MIN_BYTES', 1024):
+        return response
+    patch_vary_headers(response, ('Accept-Encoding',))
+
+    coding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if coding is None:
+        return response
+    if coding == 'br':
+        body = brotli.compress(response.content, quality=BROTLI_QUALITY)
+    else:
+        body = compress_string(response.content)
+    if len(body) >= len(response.content):
+        return response
+
+    response.content = body
+    response['Content-Length'] = str(len(body))
+    response['Content-Encoding'] = coding
+    # the bytes differ per coding, so a strong ETag would be wrong
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+    return response
+
+
+def compress_large(view):
+    """View decorator: ``compress_response`` on whatever the view returns."""
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        return compress_response(request, view(request, *args, **kwargs))
+    return wrapped
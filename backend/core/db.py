@@ -0,0 +1,35 @@
+# core/db.py
+"""MongoDB connection registration.
+
+Nothing connects at import time: ``register`` (run from ``CoreConfig.ready``)
+only records the connection settings, and mongoengine creates the
+``MongoClient`` on the first query, in whichever process makes it.  Under a
+pre-forking server that is each worker, never the master, so no client and
+none of its monitor threads are shared across a fork; ``reset`` is there for
+server hooks that want to be sure.
+"""
+import mongoengine
+from django.conf import settings
+
+from .metrics import MongoCommandTimer
+
+
+def register():
+    mongoengine.register_connection(
+        mongoengine.DEFAULT_CONNECTION_NAME,
+        db=settings.DB_NAME,
+        host=settings.MONGODB_URI,
+        serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        event_listeners=[MongoCommandTimer()],
+    )
+
+
+def reset():
+    """Forget any client this process inherited and register afresh."""
+    mongoengine.disconnect()
+    register()
+
+
+def ping():
+    """Round trip to the server; raises if it is unreachable."""
+    mongoengine.get_db().client.admin.command('ping')
@@ -0,0 +1,200 @@
+# core/encoding.py
+"""Pandas-free replacement for the fitted ``ColumnTransformer`` preprocessors.
+
+Every preprocessor shipped in ``MLModel/`` is a ``passthrough`` block of
+numeric columns followed by a ``OneHotEncoder`` on ``Ethnicity``.  Building a
+one-row DataFrame and running ``transform`` costs far more than the model
+itself, so ``CompiledEncoder`` reads the fitted column order and categories
+once and then writes a request dict straight into a float64 vector.
+``SharedEncoder`` does that once for several preprocessors at a time.
+
+Compiled tables round-trip through ``to_dict``/``from_dict`` (plain JSON), so
+a serving process can rebuild them without unpickling the preprocessor or
+importing sklearn at all.
+"""
+import numpy as np
+
+_MISSING = object()
+
+
+def lookup(record, name):
+    """``record.get("Income", record.get("income"))`` without the double lookup."""
+    value = record.get(name, _MISSING)
+    if value is _MISSING:
+        value = record.get(name.lower())
+    return value
+
+
+class CompiledEncoder:
+    """Maps a request dict to the exact vector ``preprocessor.transform`` returns.
+
+    ``numeric`` is a list of ``(column, output_index)`` pairs copied through
+    as floats; ``categorical`` is a list of ``(column, {category: output_index})``
+    lookup tables.  Categories missing from a table encode as all zeros, which
+    is ``OneHotEncoder(handle_unknown='ignore')``'s behaviour.
+    """
+
+    def __init__(self, numeric, categorical, n_features):
+        self.numeric = numeric
+        self.categorical = categorical
+        self.n_features = n_features
+        self.columns = [name for name, _ in numeric] + [name for name, _ in categorical]
+
+    @classmethod
+    def from_preprocessor(cls, preprocessor):
+        """Compile a fitted ``ColumnTransformer`` of passthrough + one-hot blocks.
+
+        Raises ``TypeError`` for any other kind of transformer and
+        ``ValueError`` for settings this encoder can't reproduce.
+        """
+        from sklearn.preprocessing import OneHotEncoder
+
+        if getattr(preprocessor, 'sparse_output_', False):
+            raise ValueError('sparse ColumnTransformer output is not supported')
+        if preprocessor.remainder != 'drop':
+            raise ValueError('only remainder="drop" is supported')
+
+        numeric, categorical, offset = [], [], 0
+        for name, transformer, columns in preprocessor.transformers_:
+            if name == 'remainder' or transformer == 'drop':
+                continue
+            if isinstance(transformer, OneHotEncoder):
+                if transformer.drop is not None:
+                    raise ValueError('OneHotEncoder(drop=...) is not supported')
+                if transformer.handle_unknown != 'ignore':
+                    raise ValueError('only handle_unknown="ignore" is supported')
+                for column, cats in zip(columns, transformer.categories_):
+                    table = {cat: offset + i for i, cat in enumerate(cats)}
+                    categorical.append((column, table))
+                    offset += len(cats)
+            elif transformer == 'passthrough' or type(transformer).__name__ == 'FunctionTransformer':
+                # fitted 'passthrough' blocks come back as identity FunctionTransformers
+                if getattr(transformer, 'func', None) is not None:
+                    raise TypeError(f'transformer {name!r} is not a passthrough')
+                for column in columns:
+                    numeric.append((column, offset))
+                    offset += 1
+            else:
+                raise TypeError(f'unsupported transformer {name!r}: {transformer!r}')
+
+        return cls(numeric, categorical, offset)
+
+    def to_dict(self):
+        """JSON-safe form of the tables; ``from_dict`` rebuilds the encoder."""
+        def plain(value):
+            return value.item() if isinstance(value, np.generic) else value
+        return {
+            'numeric': [[str(name), i] for name, i in self.numeric],
+            'categorical': [
+                [str(name), [[plain(cat), i] for cat, i in table.items()]]
+                for name, table in self.categorical
+            ],
+            'n_features': self.n_features,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        numeric = [(name, i) for name, i in data['numeric']]
+        categorical = [(name, {cat: i for cat, i in table}) for name, table in data['categorical']]
+        return cls(numeric, categorical, data['n_features'])
+
+    def encode(self, record, out=None):
+        """Encode one dict-like record. Raises ``KeyError`` for a missing numeric."""
+        if out is None:
+            out = np.zeros(self.n_features, dtype=np.float64)
+        else:
+            out.fill(0.0)
+
+        for name, i in self.numeric:
+            value = lookup(record, name)
+            if value is None:
+                raise KeyError(name)
+            out[i] = float(value)
+
+        for name, table in self.categorical:
+            i = table.get(lookup(record, name))
+            if i is not None:
+                out[i] = 1.0
+        return out
+
+    def encode_many(self, records):
+        """Encode an iterable of records into one ``(rows, n_features)`` matrix."""
+        records = list(records)
+        X = np.zeros((len(records), self.n_features), dtype=np.float64)
+        for row, record in zip(X, records):
+            self.encode(record, out=row)
+        return X
+
+    def encode_frame(self, frame):
+        """Encode a column-oriented table (a DataFrame, or a dict of arrays) at once.
+
+        Numeric columns are copied as float64 (NaN stays NaN for the caller to
+        check); each one-hot block is filled with one comparison per category.
+        """
+        rows = len(next(iter(frame.values())) if isinstance(frame, dict) else frame)
+        X = np.zeros((rows, self.n_features), dtype=np.float64)
+        for name, i in self.numeric:
+            X[:, i] = np.asarray(frame[name], dtype=np.float64)
+        for name, table in self.categorical:
+            values = np.asarray(frame[name], dtype=object)
+            for cat, i in table.items():
+                X[values == cat, i] = 1.0
+        return X
+
+
+class SharedEncoder:
+    """Encode a record once for several ``CompiledEncoder``s.
+
+    The preprocessors overlap heavily (the same numeric columns and the same
+    ``Ethnicity`` one-hot), so the record is parsed into one base vector over
+    the union of their columns and categories, and each model's input is a
+    gather from it: ``split(encode(record))[kind]`` equals
+    ``encoders[kind].encode(record)``.
+    """
+
+    def __init__(self, encoders):
+        numeric, categories = {}, {}
+        for encoder in encoders.values():
+            for name, _ in encoder.numeric:
+                numeric.setdefault(name, len(numeric))
+            for name, table in encoder.categorical:
+                union = categories.setdefault(name, {})
+                for cat in table:
+                    union.setdefault(cat, None)
+
+        offset = len(numeric)
+        categorical = []
+        for name, union in categories.items():
+            table = {cat: offset + i for i, cat in enumerate(union)}
+            categorical.append((name, table))
+            offset += len(table)
+        self.base = CompiledEncoder(list(numeric.items()), categorical, offset)
+        base_tables = dict(categorical)
+
+        self.take = {}
+        for kind, encoder in encoders.items():
+            take = np.empty(encoder.n_features, dtype=np.intp)
+            for name, i in encoder.numeric:
+                take[i] = numeric[name]
+            for name, table in encoder.categorical:
+                for cat, i in table.items():
+                    take[i] = base_tables[name][cat]
+            self.take[kind] = take
+
+    @property
+    def columns(self):
+        return self.base.columns
+
+    def encode(self, record, out=None):
+        """The base vector for one record. Raises ``KeyError`` for a missing numeric."""
+        return self.base.encode(record, out=out)
+
+    def encode_many(self, records):
+        return self.base.encode_many(records)
+
+    def encode_frame(self, frame):
+        return self.base.encode_frame(frame)
+
+    def split(self, X):
+        """``{kind: model input}`` from a base vector or ``(rows, base)`` matrix."""
+        return {kind: X[..., take] for kind, take in self.take.items()}
@@ -0,0 +1,112 @@
+# core/fake_gemini.py
+"""A local stand-in for the Gemini API, for development and load tests.
+
+Answers ``POST /models/<model>:generateContent`` with a canned reply after a
+configurable delay (``:streamGenerateContent?alt=sse`` streams it word by
+word), and can fail a fraction of calls with 503 to exercise the client's
+retries.  Point ``GEMINI_BASE_URL`` at it, e.g.
+``GEMINI_BASE_URL=http://127.0.0.1:8765``.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_reply(prompt):
+    return (
+        "- Risk assessment: moderate.\n"
+        "- Keep card balances under 30% of the limit.\n"
+        f"- (fake Gemini reply to a {len(prompt)}-character prompt)"
+    )
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # set on the server: latency and chunk_delay (seconds), failure_rate (0..1), calls counter
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_sse(self, reply):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for word in reply.split(' '):
+                event = {'candidates': [{'content': {'parts': [{'text': word + ' '}], 'role': 'model'}}]}
+                data = f'data: {json.dumps(event)}\r\n\r\n'.encode()
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+                self.wfile.flush()
+                time.sleep(self.server.chunk_delay)
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            # the client hung up mid-stream
+            self.close_connection = True
+
+    def _read_prompt(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        try:
+            return body['contents'][0]['parts'][0]['text']
+        except (KeyError, IndexError, TypeError):
+            return ''
+
+    def do_POST(self):
+        server = self.server
+        prompt = self._read_prompt()
+        with server.lock:
+            server.calls += 1
+        time.sleep(server.latency)
+
+        if random.random() < server.failure_rate:
+            self._send_json(503, {'error': {'code': 503, 'message': 'fake overload'}})
+            return
+
+        path = self.path.split('?', 1)[0]
+        if path.endswith(':streamGenerateContent'):
+            self._send_sse(make_reply(prompt))
+        elif path.endswith(':generateContent'):
+            self._send_json(200, {
+                'candidates': [{'content': {'parts': [{'text': make_reply(prompt)}], 'role': 'model'}}]
+            })
+        else:
+            self._send_json(404, {'error': {'code': 404, 'message': f'unknown method {path}'}})
+
+
+class FakeGeminiServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # load tests open many connections at once
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.05, failure_rate=0.0,
+                 chunk_delay=0.01):
+        super().__init__((host, port), FakeGeminiHandler)
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """Serve from a daemon thread; returns self for chaining."""
+        threading.Thread(target=self.serve_forever, name='fake-gemini', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
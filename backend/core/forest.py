@@ -0,0 +1,210 @@
+# core/forest.py
+"""Flat-array inference for the fitted RandomForest models.
+
+sklearn's ``predict`` pays for input validation, estimator dispatch and a
+joblib thread pool on every call, which dominates the cost of scoring one
+applicant.  ``CompiledForest`` copies every tree of a fitted forest into a
+handful of contiguous NumPy arrays once at load time and walks all trees for
+all rows together, one tree level per step.
+"""
+import json
+import os
+
+import numpy as np
+
+# rows walked together; bounds the (rows x trees) index matrix on big batches
+DEFAULT_CHUNK_ROWS = 2048
+
+# node arrays written by CompiledForest.save, one .npy file each
+ARRAY_FIELDS = ('feature', 'threshold', 'left', 'right', 'missing_left', 'value', 'roots')
+
+
+class CompiledForest:
+    """All trees of a fitted forest stored as one flat node table.
+
+    Node ``i`` tests ``X[:, feature[i]] <= threshold[i]`` and continues at
+    ``left[i]`` or ``right[i]``.  Leaves point back at themselves, so walking
+    ``max_depth`` levels always ends on a leaf.  ``value`` holds the leaf
+    output: the regression target, or the class probabilities for a
+    classifier.
+    """
+
+    def __init__(self, feature, threshold, left, right, missing_left, value,
+                 roots, max_depth, n_features, classes=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.classes = classes
+
+    @property
+    def is_classifier(self):
+        return self.classes is not None
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Compile a fitted ``RandomForestRegressor``/``RandomForestClassifier``."""
+        classes = getattr(model, 'classes_', None)
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset, max_depth = 0, 0
+
+        for est in model.estimators_:
+            tree = est.tree_
+            n = tree.node_count
+            idx = np.arange(n, dtype=np.int64)
+            is_leaf = tree.children_left < 0
+
+            left = np.where(is_leaf, idx, tree.children_left) + offset
+            right = np.where(is_leaf, idx, tree.children_right) + offset
+            feature = np.where(is_leaf, 0, tree.feature)
+            mgl = getattr(tree, 'missing_go_to_left', None)
+
+            if classes is None:
+                value = tree.value[:, 0, :1]
+            else:
+                # normalise counts/weights to per-leaf class probabilities
+                value = tree.value[:, 0, :]
+                value = value / np.maximum(value.sum(axis=1, keepdims=True), 1e-300)
+
+            features.append(feature)
+            thresholds.append(tree.threshold)
+            lefts.append(left)
+            rights.append(right)
+            missing.append(np.zeros(n, dtype=bool) if mgl is None else np.asarray(mgl, dtype=bool))
+            values.append(value)
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            left=np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp),
+            right=np.ascontiguousarray(np.concatenate(rights), dtype=np.intp),
+            missing_left=np.ascontiguousarray(np.concatenate(missing)),
+            value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            n_features=model.n_features_in_,
+            classes=None if classes is None else np.asarray(classes),
+        )
+
+    # — persistence —
+
+    def save(self, directory):
+        """Write the node arrays as ``.npy`` files that ``load`` can memory-map."""
+        os.makedirs(directory, exist_ok=True)
+        for field in ARRAY_FIELDS:
+            np.save(os.path.join(directory, f'{field}.npy'), getattr(self, field))
+        meta = {
+            'max_depth': self.max_depth,
+            'n_features': self.n_features,
+            'classes': None if self.classes is None else self.classes.tolist(),
+        }
+        with open(os.path.join(directory, 'meta.json'), 'w') as fh:
+            json.dump(meta, fh)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """Load a saved forest; with ``mmap_mode='r'`` the arrays stay in the
+        page cache and are shared by every process that maps them."""
+        with open(os.path.join(directory, 'meta.json')) as fh:
+            meta = json.load(fh)
+        arrays = {
+            field: np.load(os.path.join(directory, f'{field}.npy'), mmap_mode=mmap_mode)
+            for field in ARRAY_FIELDS
+        }
+        classes = meta['classes']
+        return cls(
+            max_depth=meta['max_depth'],
+            n_features=meta['n_features'],
+            classes=None if classes is None else np.asarray(classes),
+            **arrays
+        )
+
+    # — traversal —
+
+    def _check_input(self, X):
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(
+                f'X has {X.shape[1]} features, but the forest expects {self.n_features}'
+            )
+        return X
+
+    def _apply_chunk(self, X):
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.broadcast_to(self.roots, (X.shape[0], self.n_trees)).copy()
+        check_missing = bool(self.missing_left.any()) and bool(np.isnan(X).any())
+
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[node]]
+            go_left = x <= self.threshold[node]
+            if check_missing:
+                go_left |= np.isnan(x) & self.missing_left[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def apply(self, X, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """Return the global leaf index reached in every tree, shape (rows, trees)."""
+        X = self._check_input(X)
+        if X.shape[0] <= chunk_rows:
+            return self._apply_chunk(X)
+        return np.concatenate([
+            self._apply_chunk(X[start:start + chunk_rows])
+            for start in range(0, X.shape[0], chunk_rows)
+        ])
+
+    def predict(self, X):
+        """Forest mean for a regressor, most likely class for a classifier."""
+        if self.is_classifier:
+            return self.classes[self.predict_proba(X).argmax(axis=1)]
+        return self.value[self.apply(X), 0].mean(axis=1)
+
+    def predict_proba(self, X):
+        if not self.is_classifier:
+            raise AttributeError('predict_proba is only available for classifiers')
+        return self.value[self.apply(X)].mean(axis=1)
+
+    def tree_predictions(self, X):
+        """Every tree's output for every row, shape (rows, trees). Regressors only."""
+        if self.is_classifier:
+            raise AttributeError('tree_predictions is only available for regressors')
+        return self.value[self.apply(X), 0]
+
+    def predict_interval(self, X, percentiles=(10, 50, 90)):
+        """Spread of the per-tree predictions, from the same single traversal.
+
+        Returns ``{'mean', 'std', 'p10', ...}`` arrays over rows; ``mean`` is
+        exactly what ``predict`` returns.
+        """
+        per_tree = self.tree_predictions(X)
+        stats = {'mean': per_tree.mean(axis=1), 'std': per_tree.std(axis=1)}
+        for q, values in zip(percentiles, np.percentile(per_tree, percentiles, axis=1)):
+            stats[f'p{q:g}'] = values
+        return stats
+
+    def predict_one(self, x):
+        """Convenience wrapper for a single encoded feature vector."""
+        if self.is_classifier:
+            return self.predict_proba(x)[0]
+        return float(self.predict(x)[0])
+
+
+def load_forest(path):
+    """Load a pickled sklearn forest and compile it. Returns ``(model, compiled)``."""
+    import joblib
+    model = joblib.load(path)
+    return model, CompiledForest.from_sklearn(model)
@@ -0,0 +1,251 @@
+# core/gemini.py
+"""Shared async client for the Gemini ``generateContent`` API (plain and streaming).
+
+One pooled ``httpx.AsyncClient`` per event loop (a single loop under ASGI),
+with separate connect/read timeouts, a cap on concurrent upstream calls and
+jittered exponential backoff on transient failures.  Under WSGI every async
+view runs in a loop of its own; each client is closed when its loop shuts
+down, so those short-lived loops don't leave connections behind.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+from contextlib import aclosing
+
+import httpx
+from django.conf import settings
+
+from .metrics import observe_gemini
+
+# upstream statuses worth another attempt
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class GeminiError(Exception):
+    """Gemini could not produce a reply (after retries)."""
+
+    def __init__(self, message, status=502):
+        super().__init__(message)
+        self.status = status
+
+
+def extract_text(result):
+    """Pull the reply text out of a ``generateContent`` response body."""
+    try:
+        return result['candidates'][0]['content']['parts'][0]['text']
+    except (KeyError, IndexError, TypeError):
+        raise GeminiError(f'Unexpected Gemini response: {str(result)[:200]}')
+
+
+def chunk_text(result):
+    """The text in one ``streamGenerateContent`` chunk; ``''`` when it carries none.
+
+    The last chunk often holds only ``finishReason``, and a blocked reply may
+    have no candidate content at all.
+    """
+    try:
+        parts = result['candidates'][0]['content']['parts']
+    except (KeyError, IndexError, TypeError):
+        return ''
+    if not isinstance(parts, list):
+        return ''
+    return ''.join(part['text'] for part in parts
+                   if isinstance(part, dict) and isinstance(part.get('text'), str))
+
+
+def _block_reason(result):
+    try:
+        return result['promptFeedback']['blockReason']
+    except (KeyError, TypeError):
+        return None
+
+
+async def _close_on_shutdown(client):
+    """Parked until the loop shuts down, then closes ``client`` on that loop.
+
+    ``asyncio.run`` (which asgiref's ``async_to_sync`` uses for every WSGI
+    request) finalises pending async generators before closing the loop, so
+    the ``finally`` runs while the client's connections can still be closed.
+    """
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
+class GeminiClient:
+    def __init__(self, api_key, base_url, model, connect_timeout=3.0, read_timeout=30.0,
+                 max_connections=20, max_concurrency=16, max_retries=2, backoff=0.25,
+                 transport=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections, max_keepalive_connections=max_connections
+        )
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.transport = transport  # an httpx transport to use instead of the network (tests)
+        # httpx clients and semaphores belong to one event loop
+        self._per_loop = {}
+        self._lock = threading.Lock()
+
+    def url(self, method):
+        return f'{self.base_url}/models/{self.model}:{method}'
+
+    async def _loop_state(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._per_loop.get(loop)
+            if state is None:
+                # forget clients whose loop is gone; _close_on_shutdown closed them
+                for old in [l for l in self._per_loop if l.is_closed()]:
+                    del self._per_loop[old]
+                client = httpx.AsyncClient(
+                    timeout=self.timeout,
+                    limits=self.limits,
+                    headers={'x-goog-api-key': self.api_key or ''},
+                    transport=self.transport,
+                )
+                closer = _close_on_shutdown(client)
+                state = self._per_loop[loop] = (client, asyncio.Semaphore(self.max_concurrency), closer)
+            else:
+                closer = None
+        if closer is not None:
+            await closer.asend(None)  # run it up to its yield
+        return state[0], state[1]
+
+    async def _sleep_before_retry(self, attempt):
+        # full jitter: anywhere between 0 and the exponential ceiling
+        await asyncio.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    async def generate(self, prompt):
+        """Return the reply text for ``prompt``."""
+        started, outcome = time.perf_counter(), 'error'
+        try:
+            reply = await self._generate(prompt)
+            outcome = 'ok'
+            return reply
+        finally:
+            observe_gemini('generate', outcome, time.perf_counter() - started)
+
+    async def _generate(self, prompt):
+        client, semaphore = await self._loop_state()
+        payload = {'contents': [{'parts': [{'text': prompt}]}]}
+
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                last = attempt == self.max_retries
+                try:
+                    response = await client.post(self.url('generateContent'), json=payload)
+                except httpx.TimeoutException:
+                    if last:
+                        raise GeminiError('Gemini request timed out', status=504)
+                except httpx.TransportError as e:
+                    if last:
+                        raise GeminiError(f'Gemini unreachable: {e}')
+                else:
+                    if response.status_code == 200:
+                        return extract_text(response.json())
+                    if last or response.status_code not in RETRY_STATUSES:
+                        raise GeminiError(
+                            f'Gemini returned {response.status_code}: {response.text[:200]}'
+                        )
+                await self._sleep_before_retry(attempt)
+
+    async def stream(self, prompt):
+        """Yield reply text chunks from ``streamGenerateContent`` as they arrive.
+
+        Failures before the first chunk are retried like ``generate``; once
+        text has been yielded an error is raised to the caller.  Closing the
+        generator (e.g. the client went away) closes the upstream response.
+        """
+        started, outcome = time.perf_counter(), 'error'
+        try:
+            async with aclosing(self._stream(prompt)) as chunks:
+                async for text in chunks:
+                    yield text
+            outcome = 'ok'
+        except GeneratorExit:
+            outcome = 'closed'
+            raise
+        finally:
+            observe_gemini('stream', outcome, time.perf_counter() - started)
+
+    async def _stream(self, prompt):
+        client, semaphore = await self._loop_state()
+        payload = {'contents': [{'parts': [{'text': prompt}]}]}
+        url = self.url('streamGenerateContent')
+
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                last = attempt == self.max_retries
+                started = False
+                try:
+                    async with client.stream('POST', url, params={'alt': 'sse'}, json=payload) as response:
+                        if response.status_code != 200:
+                            body = (await response.aread()).decode(errors='replace')
+                            if last or response.status_code not in RETRY_STATUSES:
+                                raise GeminiError(f'Gemini returned {response.status_code}: {body[:200]}')
+                        else:
+                            blocked = None
+                            async for line in response.aiter_lines():
+                                if not line.startswith('data:'):
+                                    continue
+                                try:
+                                    result = json.loads(line[5:])
+                                except json.JSONDecodeError:
+                                    raise GeminiError(f'Malformed Gemini stream chunk: {line[:200]}')
+                                text = chunk_text(result)
+                                if text:
+                                    started = True
+                                    yield text
+                                else:
+                                    blocked = blocked or _block_reason(result)
+                            if not started:
+                                raise GeminiError(
+                                    f'Gemini blocked the prompt: {blocked}' if blocked
+                                    else 'Gemini returned no text'
+                                )
+                            return
+                except httpx.TimeoutException:
+                    if started or last:
+                        raise GeminiError('Gemini request timed out', status=504)
+                except httpx.TransportError as e:
+                    if started or last:
+                        raise GeminiError(f'Gemini unreachable: {e}')
+                await self._sleep_before_retry(attempt)
+
+    async def aclose(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._per_loop.pop(loop, None)
+        if state is not None:
+            await state[2].aclose()  # runs _close_on_shutdown's finally now
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_gemini_client():
+    """Process-wide client configured from settings."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GeminiClient(
+                    settings.GEMINI_API_KEY,
+                    settings.GEMINI_BASE_URL,
+                    settings.GEMINI_MODEL,
+                    connect_timeout=settings.GEMINI_CONNECT_TIMEOUT,
+                    read_timeout=settings.GEMINI_READ_TIMEOUT,
+                    max_connections=settings.GEMINI_MAX_CONNECTIONS,
+                    max_concurrency=settings.GEMINI_MAX_CONCURRENCY,
+                    max_retries=settings.GEMINI_MAX_RETRIES,
+                )
+    return _client
@@ -0,0 +1,19 @@
+# core/jsonio.py
+"""orjson for the scoring endpoints: request parsing and JSON responses.
+
+``loads`` takes the raw request body (bytes) and raises
+``orjson.JSONDecodeError``, a subclass of ``json.JSONDecodeError``, so the
+views' existing ``except json.JSONDecodeError`` handlers still apply.
+"""
+import orjson
+from django.http import HttpResponse
+
+loads = orjson.loads
+
+
+class FastJsonResponse(HttpResponse):
+    """``JsonResponse`` encoded with orjson; NumPy arrays and scalars serialize as-is."""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY), **kwargs)
@@ -0,0 +1,58 @@
+# core/management/commands/backfill_summaries.py
+import time
+
+from django.core.management.base import BaseCommand
+from pymongo import ReplaceOne
+
+from core.models_mongo import Prediction, UserSummary
+
+
+class Command(BaseCommand):
+    help = ("Rebuild user_summaries from the predictions collection. "
+            "Run it while estimates are paused, or rerun it afterwards: a "
+            "summary rebuilt mid-flush can miss that flush's predictions.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='rebuild only this userId')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='summaries written per bulk_write')
+        parser.add_argument('--clear', action='store_true',
+                            help='delete the existing summaries first (drops users with no predictions)')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        match = {'userId': options['user']} if options['user'] else {}
+        pipeline = [
+            {'$match': match},
+            # chronological, so $last picks each user's newest prediction
+            {'$sort': {'createdAt': 1, '_id': 1}},
+            {'$group': {
+                '_id': '$userId',
+                'estimateCount': {'$sum': 1},
+                'latestCreditLimit': {'$last': '$creditLimit'},
+                'latestApprovalProbability': {'$last': '$approvalProbability'},
+                'minCreditLimit': {'$min': '$creditLimit'},
+                'maxCreditLimit': {'$max': '$creditLimit'},
+                'firstEstimateAt': {'$min': '$createdAt'},
+                'latestEstimateAt': {'$max': '$createdAt'},
+            }},
+        ]
+
+        summaries = UserSummary._get_collection()
+        removed = summaries.delete_many(match).deleted_count if options['clear'] else 0
+        batch, written = [], 0
+        for row in Prediction._get_collection().aggregate(pipeline, allowDiskUse=True):
+            user_id = row.pop('_id')
+            batch.append(ReplaceOne({'userId': user_id}, {'userId': user_id, **row}, upsert=True))
+            if len(batch) >= options['batch_size']:
+                summaries.bulk_write(batch, ordered=False)
+                written += len(batch)
+                batch = []
+        if batch:
+            summaries.bulk_write(batch, ordered=False)
+            written += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {written} summaries ({removed} cleared first) '
+            f'in {time.perf_counter() - start:.2f}s'
+        ))
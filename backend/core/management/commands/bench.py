@@ -0,0 +1,293 @@
+# core/management/commands/bench.py
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import socket
+import subprocess
+import time
+from datetime import datetime
+
+import httpx
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.fake_gemini import FakeGeminiServer
+from core.management.commands.check_models import load_credit_csv
+
+# name -> (method, path); {user} is filled from the seeded users
+ENDPOINTS = {
+    'limit':    ('POST', '/api/limit/'),
+    'approval': ('POST', '/api/approval/'),
+    'estimate': ('POST', '/api/estimate/'),
+    'history':  ('GET',  '/api/history/{user}/'),
+    'chatbot':  ('POST', '/api/chatbot/'),
+    'insight':  ('POST', '/api/insight/'),
+}
+
+APPLICANT_FIELDS = ['Income', 'Rating', 'Cards', 'Age', 'Balance', 'Education',
+                    'Student', 'Married', 'Ethnicity']
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _use_mongomock():
+    import mongoengine
+    import mongomock
+
+    # mongomock edits the projection dict it is given, which races when the
+    # views share a module-level projection across threads; pymongo copies it
+    find = mongomock.Collection.find
+
+    def find_with_copied_projection(self, filter=None, projection=None, *args, **kwargs):
+        if isinstance(projection, dict):
+            projection = dict(projection)
+        return find(self, filter, projection, *args, **kwargs)
+
+    mongomock.Collection.find = find_with_copied_projection
+    mongoengine.connect('bench', mongo_client_class=mongomock.MongoClient)
+
+
+def _serve(port, mongo_uri, gemini_url, users, history_rows, ready):
+    """Child process: point the app at the stand-ins, seed history, run uvicorn."""
+    import mongoengine
+    import uvicorn
+    from banking_backend.asgi import application
+    from core import views
+    from core.models_mongo import Features, Prediction, UserProfile, UserSummary
+
+    settings.GEMINI_BASE_URL = gemini_url
+    settings.GEMINI_API_KEY = settings.GEMINI_API_KEY or 'bench'
+    mongoengine.disconnect()
+    if mongo_uri:
+        mongoengine.connect(host=mongo_uri)
+    else:
+        _use_mongomock()
+        # mongomock's bulk_write rejects pymongo's UpdateOne; the summary
+        # upserts run on the writer thread, off the request path, anyway
+        views.prediction_writer.on_written = None
+    for document in (Prediction, UserProfile, UserSummary):
+        document._collection = None
+
+    features = Features(Income=50000, Rating=400, Cards=2, Age=40, Balance=300,
+                        Education=14, Student=False, Married=True, Ethnicity='Caucasian')
+    start = datetime(2025, 1, 1)
+    for user in users:
+        Prediction.objects.insert([
+            Prediction(userId=user, features=features, creditLimit=4000 + i,
+                       approvalProbability=0.5, createdAt=start.replace(minute=i % 60, hour=i // 60 % 24))
+            for i in range(history_rows)
+        ], load_bulk=False)
+
+    config = uvicorn.Config(application, host='127.0.0.1', port=port,
+                            log_level='warning', lifespan='off')
+    server = uvicorn.Server(config)
+    ready.set()
+    server.run()
+
+
+def _summarise(latencies, statuses, elapsed):
+    ms = np.asarray(latencies) * 1000
+    # transport failures are recorded under the exception name, not a status
+    ok = sum(count for status, count in statuses.items() if status.isdigit() and int(status) < 400)
+    return {
+        'requests': len(ms),
+        'errors': len(ms) - ok,
+        'statuses': statuses,
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(len(ms) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(float(ms.mean()), 3),
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(ms, 95)), 3),
+        'p99_ms': round(float(np.percentile(ms, 99)), 3),
+        'max_ms': round(float(ms.max()), 3),
+    }
+
+
+class Command(BaseCommand):
+    help = ("Load-test the API end to end: boot the app under uvicorn against "
+            "mongomock (or --mongo-uri) and a local fake Gemini, drive each "
+            "endpoint at a fixed concurrency with applicants sampled from "
+            "credit.csv, then report throughput and p50/p95/p99 and write the "
+            "results as JSON. Needs mongomock unless --mongo-uri is given.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoints', default=','.join(ENDPOINTS),
+                            help=f'comma-separated subset of: {", ".join(ENDPOINTS)}')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=500, help='timed requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=20, help='untimed requests per endpoint')
+        parser.add_argument('--csv', default=os.path.join(str(settings.MODEL_DIR), 'credit.csv'))
+        parser.add_argument('--users', type=int, default=20, help='users seeded for /api/history/')
+        parser.add_argument('--history-rows', type=int, default=200, help='predictions per seeded user')
+        parser.add_argument('--settle', type=float, default=1.0,
+                            help='seconds to pause between endpoints so queued writes land')
+        parser.add_argument('--gemini-latency-ms', type=float, default=50.0)
+        parser.add_argument('--mongo-uri', help='use this (throwaway!) MongoDB instead of mongomock')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='results file (default: bench-results/<timestamp>.json)')
+        parser.add_argument('--compare', help='earlier results file to diff against')
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['endpoints'].split(',') if name.strip()]
+        unknown = set(names) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f'Unknown endpoint(s): {", ".join(sorted(unknown))}')
+        if not options['mongo_uri']:
+            try:
+                import mongomock  # noqa: F401
+            except ImportError:
+                raise CommandError('pip install mongomock, or pass --mongo-uri')
+
+        rng = random.Random(options['seed'])
+        frame = load_credit_csv(options['csv'])
+        applicants = frame[APPLICANT_FIELDS].to_dict('records')
+        users = [f'bench-user-{i}' for i in range(options['users'])]
+
+        gemini = FakeGeminiServer(latency=options['gemini_latency_ms'] / 1000.0).start()
+        port = _free_port()
+        ctx = multiprocessing.get_context('fork')
+        ready = ctx.Event()
+        server = ctx.Process(
+            target=_serve, daemon=True,
+            args=(port, options['mongo_uri'], gemini.base_url, users, options['history_rows'], ready),
+        )
+        server.start()
+        try:
+            if not ready.wait(60):
+                raise CommandError('the app did not start')
+            base_url = f'http://127.0.0.1:{port}'
+            self._wait_until_up(base_url)
+
+            results = {}
+            for name in names:
+                results[name] = asyncio.run(self._run_endpoint(
+                    base_url, name, applicants, users, rng, options
+                ))
+                self._print_row(name, results[name])
+                time.sleep(options['settle'])
+        finally:
+            server.terminate()
+            server.join(10)
+            gemini.stop()
+
+        report = {'meta': self._meta(options, gemini.calls), 'endpoints': results}
+        output = options['output'] or os.path.join(
+            str(settings.BASE_DIR), 'bench-results',
+            f'{datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")}.json'
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as fh:
+            json.dump(report, fh, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Results written to {output}'))
+
+        if options['compare']:
+            with open(options['compare']) as fh:
+                self._print_comparison(json.load(fh), report)
+
+    # — load generation —
+
+    def _request(self, name, applicants, users, rng):
+        method, path = ENDPOINTS[name]
+        applicant = dict(rng.choice(applicants))
+        user = rng.choice(users)
+        if name == 'history':
+            return method, path.format(user=user), None
+        if name == 'estimate':
+            return method, path, {**applicant, 'userId': user}
+        if name == 'chatbot':
+            return method, path, {'userData': applicant, 'question': 'How can I raise my limit?'}
+        if name == 'insight':
+            return method, path, {'userData': applicant}
+        return method, path, applicant
+
+    async def _run_endpoint(self, base_url, name, applicants, users, rng, options):
+        requests = [self._request(name, applicants, users, rng)
+                    for _ in range(options['warmup'] + options['requests'])]
+        warmup, timed = requests[:options['warmup']], requests[options['warmup']:]
+        latencies, statuses, errors = [], {}, []
+        limits = httpx.Limits(max_connections=options['concurrency'])
+
+        async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+            async def worker(queue, record):
+                while queue:
+                    method, path, body = queue.pop()
+                    start = time.perf_counter()
+                    try:
+                        response = await client.request(method, path, json=body)
+                        status = str(response.status_code)
+                        if response.status_code >= 400 and not errors:
+                            errors.append(response.text[:500])
+                    except httpx.HTTPError as e:
+                        status = type(e).__name__
+                        errors.append(repr(e))
+                    if record:
+                        latencies.append(time.perf_counter() - start)
+                        statuses[status] = statuses.get(status, 0) + 1
+
+            for queue, record in ((warmup, False), (timed, True)):
+                started = time.perf_counter()
+                await asyncio.gather(*[worker(queue, record) for _ in range(options['concurrency'])])
+            elapsed = time.perf_counter() - started
+        return {**_summarise(latencies, statuses, elapsed), 'first_error': errors[0] if errors else None}
+
+    def _wait_until_up(self, base_url, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                httpx.get(f'{base_url}/api/', timeout=1)
+                return
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        raise CommandError('the app did not start listening')
+
+    # — reporting —
+
+    def _meta(self, options, gemini_calls):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                cwd=str(settings.BASE_DIR), timeout=5
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            commit = None
+        return {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'commit': commit,
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'concurrency': options['concurrency'],
+            'requests': options['requests'],
+            'warmup': options['warmup'],
+            'users': options['users'],
+            'history_rows': options['history_rows'],
+            'mongo': 'uri' if options['mongo_uri'] else 'mongomock',
+            'gemini_latency_ms': options['gemini_latency_ms'],
+            'gemini_calls': gemini_calls,
+            'seed': options['seed'],
+        }
+
+    def _print_row(self, name, r):
+        self.stdout.write(
+            f"{name:<9} {r['throughput_rps']:>9.1f} req/s   p50 {r['p50_ms']:>8.2f} ms   "
+            f"p95 {r['p95_ms']:>8.2f} ms   p99 {r['p99_ms']:>8.2f} ms   errors {r['errors']}"
+        )
+
+    def _print_comparison(self, before, after):
+        self.stdout.write(f"vs {before['meta'].get('commit')} ({before['meta'].get('timestamp')}):")
+        for name, new in after['endpoints'].items():
+            old = before['endpoints'].get(name)
+            if old is None:
+                continue
+            deltas = []
+            for key in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+                change = (new[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+                deltas.append(f'{key} {change:+.1f}%')
+            self.stdout.write(f'  {name:<9} ' + '   '.join(deltas))
@@ -0,0 +1,151 @@
+# core/management/commands/check_models.py
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.encoding import CompiledEncoder, SharedEncoder
+from core.forest import load_forest
+
+MODEL_DIR = str(settings.MODEL_DIR)
+
+# (model pickle, preprocessor pickle, input columns) exactly as in CreditModel.ipynb
+MODELS = [
+    ('credit_limit_model', 'limit_preprocessor',
+     ['Income', 'Rating', 'Cards', 'Age', 'Balance', 'Ethnicity']),
+    ('approval_model', 'approval_preprocessor',
+     ['Income', 'Rating', 'Cards', 'Age', 'Balance', 'Education', 'Student', 'Married', 'Ethnicity']),
+    ('credit_score_model', 'score_preprocessor',
+     ['Income', 'Cards', 'Age', 'Balance', 'Education', 'Student', 'Married', 'Gender', 'Ethnicity']),
+]
+
+
+def clean_credit_frame(df):
+    """Apply the training notebook's cleaning to a frame in the credit.csv schema."""
+    df['Income'] = df['Income'] * 1000
+    binary_map = {'Yes': 1, 'No': 0, 'Male': 1, 'Female': 0}
+    for col in ['Gender', 'Student', 'Married']:
+        df[col] = df[col].map(binary_map)
+    return df
+
+
+def load_credit_csv(path):
+    """Read credit.csv and apply the same cleaning the training notebook did."""
+    return clean_credit_frame(pd.read_csv(path))
+
+
+def _median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples)) * 1000
+
+
+class Command(BaseCommand):
+    help = ("Check the compiled encoders and forests against sklearn on "
+            "credit.csv and compare single-row and batch latency.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--csv', default=os.path.join(MODEL_DIR, 'credit.csv'))
+        parser.add_argument('--repeat', type=int, default=50,
+                            help='timed repetitions per measurement')
+        parser.add_argument('--tolerance', type=float, default=1e-9)
+
+    def handle(self, *args, **options):
+        df = load_credit_csv(options['csv'])
+        repeat = options['repeat']
+        failures = []
+        compiled = {}
+
+        for model_name, pre_name, columns in MODELS:
+            model, forest = load_forest(os.path.join(MODEL_DIR, f'{model_name}.pkl'))
+            preprocessor = joblib.load(os.path.join(MODEL_DIR, f'{pre_name}.pkl'))
+            X = preprocessor.transform(df[columns])
+
+            # — encoder: identical output to transform, including unseen categories —
+            encoder = CompiledEncoder.from_preprocessor(preprocessor)
+            compiled[model_name] = (encoder, forest)
+            frame = df[columns].copy()
+            frame.loc[frame.index[::7], 'Ethnicity'] = 'Not Specified'
+            records = frame.to_dict('records')
+            encoded_ok = np.array_equal(encoder.encode_many(records), preprocessor.transform(frame))
+            if not encoded_ok:
+                failures.append(pre_name)
+            self.stdout.write(
+                f"{pre_name}: encoder output {'matches' if encoded_ok else 'DIFFERS FROM'} transform; "
+                f"1 row: DataFrame+transform {_median_ms(lambda: preprocessor.transform(pd.DataFrame([records[0]])), repeat):.3f} ms   "
+                f"compiled {_median_ms(lambda: encoder.encode(records[0]), repeat):.4f} ms"
+            )
+
+            if forest.is_classifier:
+                sk_fn, fast_fn = model.predict_proba, forest.predict_proba
+            else:
+                sk_fn, fast_fn = model.predict, forest.predict
+
+            diff = float(np.max(np.abs(sk_fn(X) - fast_fn(X))))
+            ok = diff <= options['tolerance'] * max(1.0, float(np.max(np.abs(sk_fn(X)))))
+            if not ok:
+                failures.append(model_name)
+
+            row = X[:1]
+            self.stdout.write(
+                f"{model_name}: {forest.n_trees} trees, {len(forest.feature)} nodes, "
+                f"max |diff| over {len(X)} rows = {diff:.3g} [{'OK' if ok else 'MISMATCH'}]"
+            )
+            self.stdout.write(
+                f"  1 row:    sklearn {_median_ms(lambda: sk_fn(row), repeat):8.3f} ms   "
+                f"compiled {_median_ms(lambda: fast_fn(row), repeat):8.3f} ms"
+            )
+            self.stdout.write(
+                f"  {len(X)} rows: sklearn {_median_ms(lambda: sk_fn(X), repeat):8.3f} ms   "
+                f"compiled {_median_ms(lambda: fast_fn(X), repeat):8.3f} ms"
+            )
+
+        self._check_shared(df, compiled, repeat, failures)
+
+        if failures:
+            raise CommandError(f"Compiled artifacts disagree with sklearn: {', '.join(failures)}")
+
+    def _check_shared(self, df, compiled, repeat, failures):
+        """One shared encode for all three models vs. three separate passes (/api/assess/)."""
+        encoders = {name: encoder for name, (encoder, _) in compiled.items()}
+        forests = {name: forest for name, (_, forest) in compiled.items()}
+        shared = SharedEncoder(encoders)
+
+        frame = df[shared.columns].copy()
+        frame.loc[frame.index[::7], 'Ethnicity'] = 'Not Specified'
+        records = frame.to_dict('records')
+        parts = shared.split(shared.encode_many(records))
+        shared_ok = all(
+            np.array_equal(parts[name], encoder.encode_many(records))
+            for name, encoder in encoders.items()
+        )
+        if not shared_ok:
+            failures.append('shared encoder')
+
+        def run(forest, X):
+            return forest.predict_proba(X)[:, 1] if forest.is_classifier else forest.predict(X)
+
+        def separate(rows):
+            return [run(forests[name], encoder.encode_many(rows)) for name, encoder in encoders.items()]
+
+        def combined(rows):
+            inputs = shared.split(shared.encode_many(rows))
+            return [run(forests[name], inputs[name]) for name in encoders]
+
+        self.stdout.write(
+            f"shared encoder ({len(shared.columns)} columns -> {', '.join(encoders)}): "
+            f"{'matches' if shared_ok else 'DIFFERS FROM'} the separate encoders"
+        )
+        for rows in (records[:1], records):
+            self.stdout.write(
+                f"  {len(rows)} row(s), encode + 3 models: "
+                f"separate {_median_ms(lambda: separate(rows), repeat):8.3f} ms   "
+                f"shared {_median_ms(lambda: combined(rows), repeat):8.3f} ms"
+            )
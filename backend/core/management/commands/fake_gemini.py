@@ -0,0 +1,32 @@
+# core/management/commands/fake_gemini.py
+from django.core.management.base import BaseCommand
+
+from core.fake_gemini import FakeGeminiServer
+
+
+class Command(BaseCommand):
+    help = "Run a local fake Gemini API (set GEMINI_BASE_URL to the printed URL)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency-ms', type=float, default=50.0)
+        parser.add_argument('--chunk-delay-ms', type=float, default=10.0,
+                            help='pause between streamed chunks')
+        parser.add_argument('--failure-rate', type=float, default=0.0,
+                            help='fraction of calls answered with 503')
+
+    def handle(self, *args, **options):
+        server = FakeGeminiServer(
+            options['host'], options['port'],
+            latency=options['latency_ms'] / 1000.0,
+            failure_rate=options['failure_rate'],
+            chunk_delay=options['chunk_delay_ms'] / 1000.0,
+        )
+        self.stdout.write(f"Fake Gemini listening on {server.base_url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,90 @@
+# core/management/commands/model_memory.py
+import json
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.model_store import ModelStore
+
+FORESTS = ['credit_limit_model', 'approval_model']
+
+# Runs in a fresh interpreter per worker: import the libraries, measure,
+# load the forests the chosen way, score one row, measure again, then stay
+# alive until the parent has read every worker (so shared pages overlap).
+WORKER = r'''
+import json, sys
+import joblib, numpy as np, sklearn.ensemble
+sys.path.insert(0, sys.argv[3])
+from core.forest import CompiledForest
+
+def memory_kb():
+    fields = {}
+    with open('/proc/self/smaps_rollup') as fh:
+        for line in fh:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    return {'rss': fields.get('Rss', 0), 'pss': fields.get('Pss', 0),
+            'private': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)}
+
+mode, paths = sys.argv[1], json.loads(sys.argv[2])
+before = memory_kb()
+keep = []
+for path in paths:
+    if mode == 'pickle':
+        model = joblib.load(path)
+        model.n_jobs = 1
+        model.predict(np.zeros((1, model.n_features_in_)))
+    else:
+        model = CompiledForest.load(path)
+        model.predict(np.zeros((1, model.n_features)))
+    keep.append(model)
+print(json.dumps({'before': before, 'after': memory_kb()}), flush=True)
+sys.stdin.read()
+print(json.dumps({'after': memory_kb()}), flush=True)
+'''
+
+
+class Command(BaseCommand):
+    help = ("Start N worker processes that each load the forests and report "
+            "per-worker RSS/PSS/private memory, for the pickle loader and the "
+            "memory-mapped model store.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        store = ModelStore(settings.MODEL_DIR, settings.MODEL_CACHE_DIR)
+        for name in FORESTS:
+            store.forest(name)  # make sure the compiled cache exists
+
+        sources = {
+            'pickle': [store.path(name) for name in FORESTS],
+            'mmap': [
+                f"{store.cache_dir}/{name}-{store.digest(name)[:16]}" for name in FORESTS
+            ],
+        }
+
+        for mode, paths in sources.items():
+            procs = [
+                subprocess.Popen(
+                    [sys.executable, '-c', WORKER, mode, json.dumps(paths), str(settings.BASE_DIR)],
+                    stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+                )
+                for _ in range(options['workers'])
+            ]
+            loaded = [json.loads(proc.stdout.readline()) for proc in procs]
+            # every worker is now holding its models; PSS splits shared pages between them
+            for proc in procs:
+                proc.stdin.close()
+            final = [json.loads(proc.stdout.readline()) for proc in procs]
+            for proc in procs:
+                proc.wait()
+
+            self.stdout.write(f"{mode}: memory added by the models, per worker ({len(procs)} workers)")
+            for key in ('rss', 'pss', 'private'):
+                values = [(f['after'][key] - l['before'][key]) / 1024 for l, f in zip(loaded, final)]
+                self.stdout.write(f"  {key:>7}: mean {sum(values) / len(values):6.1f} MB   "
+                                  f"max {max(values):6.1f} MB")
@@ -0,0 +1,170 @@
+# core/management/commands/score_file.py
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+
+from core.encoding import SharedEncoder
+from core.management.commands.check_models import clean_credit_frame
+from core.model_store import ModelStore
+from core.registry import ARTIFACTS, get_registry
+
+OUTPUT_COLUMNS = ['predicted_limit', 'approval_probability', 'predicted_score']
+
+# — worker side: one ModelStore per process, built by the pool initializer —
+
+_worker = None
+
+
+def _init_worker(model_dir, cache_dir):
+    global _worker
+    store = ModelStore(model_dir, cache_dir)
+    forests = {kind: store.forest(model) for kind, (model, _) in ARTIFACTS.items()}
+    encoder = SharedEncoder({kind: store.encoder(pre) for kind, (_, pre) in ARTIFACTS.items()})
+    _worker = (forests, encoder)
+
+
+def _score_chunk(chunk):
+    """``(rows, 3)`` limit/approval/score for a raw credit.csv chunk; NaN for unusable rows."""
+    forests, encoder = _worker
+    frame = clean_credit_frame(chunk.copy())
+    X = encoder.encode_frame(frame)
+    # blank fields and unmapped Yes/No values come through as NaN
+    bad = np.isnan(X).any(axis=1)
+    X[bad] = 0.0
+    inputs = encoder.split(X)
+    out = np.column_stack([
+        forests['limit'].predict(inputs['limit']),
+        forests['approval'].predict_proba(inputs['approval'])[:, 1],
+        forests['score'].predict(inputs['score']),
+    ])
+    out[bad] = np.nan
+    return out
+
+
+def _fingerprint(path):
+    st = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+class Command(BaseCommand):
+    help = ("Score a CSV in the credit.csv schema with the limit, approval and "
+            "score models. The input is read in chunks which a process pool "
+            "scores in parallel; results are appended to the output in input "
+            "order. Progress is checkpointed after every chunk, so rerunning "
+            "the same command resumes where it stopped.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('input')
+        parser.add_argument('--output', help='default: <input>.scored.csv')
+        parser.add_argument('--chunk-size', type=int, default=20000)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--model-version', help='model version name (default: the active one)')
+        parser.add_argument('--restart', action='store_true',
+                            help='ignore an existing checkpoint and start over')
+        parser.add_argument('--progress-every', type=float, default=5.0,
+                            help='seconds between progress lines')
+
+    def handle(self, *args, **options):
+        source = options['input']
+        output = options['output'] or f'{os.path.splitext(source)[0]}.scored.csv'
+        checkpoint_path = f'{output}.checkpoint'
+        chunk_size = options['chunk_size']
+        workers = max(1, options['workers'])
+
+        registry = get_registry()
+        name = options['model_version'] or registry.pinned_name()
+        model_dir = registry.available().get(name)
+        if model_dir is None:
+            raise CommandError(f'Unknown model version: {name}')
+        store = ModelStore(model_dir, registry.cache_dir)
+        label = f'{name}@{store.version([a for pair in ARTIFACTS.values() for a in pair])}'
+
+        job = {'input': _fingerprint(source), 'chunk_size': chunk_size, 'model_version': label}
+        state = self._load_checkpoint(checkpoint_path, job, output, options['restart'])
+
+        # compile (or map) the forests once here so workers only ever map the cache
+        for model, _ in ARTIFACTS.values():
+            store.forest(model)
+
+        started = time.perf_counter()
+        last_report = started
+        rows_this_run = 0
+        with open(output, 'r+b' if state['rows'] else 'wb') as out, ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker,
+            initargs=(model_dir, registry.cache_dir)
+        ) as pool:
+            # drop anything written after the last checkpoint
+            out.truncate(state['output_bytes'])
+            out.seek(state['output_bytes'])
+
+            reader = pd.read_csv(source, chunksize=chunk_size)
+            pending = deque()
+            for index, chunk in enumerate(reader):
+                if index < state['chunks']:
+                    continue  # already scored on a previous run
+                pending.append((chunk, pool.submit(_score_chunk, chunk)))
+                # bounded read-ahead keeps memory flat however long the file is
+                while len(pending) >= 2 * workers or (pending and pending[0][1].done()):
+                    rows_this_run += self._write_chunk(out, pending.popleft(), state, checkpoint_path, job)
+                now = time.perf_counter()
+                if now - last_report >= options['progress_every']:
+                    last_report = now
+                    self._progress(state['rows'], rows_this_run, now - started)
+            while pending:
+                rows_this_run += self._write_chunk(out, pending.popleft(), state, checkpoint_path, job)
+
+        elapsed = time.perf_counter() - started
+        os.remove(checkpoint_path)
+        self.stdout.write(self.style.SUCCESS(
+            f'Scored {state["rows"]} rows ({state["failed"]} unusable) with {label} -> {output}; '
+            f'this run: {rows_this_run} rows in {elapsed:.1f}s = '
+            f'{rows_this_run / elapsed if elapsed else 0:,.0f} rows/sec on {workers} worker(s)'
+        ))
+
+    def _write_chunk(self, out, item, state, checkpoint_path, job):
+        chunk, future = item
+        scores = future.result()
+        frame = chunk.copy()
+        for i, column in enumerate(OUTPUT_COLUMNS):
+            frame[column] = scores[:, i]
+        frame.to_csv(out, header=state['rows'] == 0, index=False, float_format='%.6g')
+        out.flush()
+        os.fsync(out.fileno())
+
+        state['rows'] += len(frame)
+        state['chunks'] += 1
+        state['failed'] += int(np.isnan(scores[:, 0]).sum())
+        state['output_bytes'] = out.tell()
+        # write-then-rename so a crash never leaves a torn checkpoint
+        tmp = f'{checkpoint_path}.tmp'
+        with open(tmp, 'w') as fh:
+            json.dump({**job, **state}, fh)
+        os.replace(tmp, checkpoint_path)
+        return len(frame)
+
+    def _load_checkpoint(self, path, job, output, restart):
+        fresh = {'rows': 0, 'chunks': 0, 'failed': 0, 'output_bytes': 0}
+        if restart or not os.path.exists(path):
+            return fresh
+        with open(path) as fh:
+            saved = json.load(fh)
+        if any(saved.get(key) != value for key, value in job.items()):
+            raise CommandError(
+                f'{path} belongs to a different input, chunk size or model version; '
+                'pass --restart to start over'
+            )
+        if not os.path.exists(output) or os.path.getsize(output) < saved['output_bytes']:
+            raise CommandError(f'{output} is shorter than its checkpoint; pass --restart')
+        self.stdout.write(f"Resuming after {saved['rows']} rows ({saved['chunks']} chunks)")
+        return {key: saved[key] for key in fresh}
+
+    def _progress(self, total_rows, rows_this_run, elapsed):
+        self.stdout.write(
+            f'{total_rows:,} rows scored ({rows_this_run / elapsed:,.0f} rows/sec)'
+        )
@@ -0,0 +1,233 @@
+# core/metrics.py
+"""In-process request metrics, exposed in Prometheus text format at ``/metrics``.
+
+``MetricsMiddleware`` records every request into a per-route latency
+histogram and a status counter; ``stage('encode')`` times a block inside a
+view; pymongo command events (``MongoCommandTimer``) and Gemini calls are
+recorded the same way.  With ``METRICS_SERVER_TIMING`` on, the stage, Mongo
+and Gemini times of a request are also returned in a ``Server-Timing`` header.
+
+Recording is a ``bisect`` and a short locked update, a few microseconds.
+Numbers are per process: with several workers, scrape each one (or run one
+worker per scrape target).
+"""
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from pymongo import monitoring
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+# seconds; from sub-millisecond model calls up to slow Gemini replies
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+
+# request methods kept as labels; anything else is counted as "other"
+METHODS = frozenset(('GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD', 'OPTIONS'))
+
+# (name, seconds) pairs for the current request; None outside a request
+_timings = ContextVar('request_timings', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, seconds, *labels):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][i] += 1
+            state[1] += seconds
+            state[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            values = sorted((labels, ([*counts], total, n)) for labels, (counts, total, n) in self._values.items())
+        for labels, (counts, total, n) in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                le = bound if bound == '+Inf' else repr(float(bound))
+                lines.append(
+                    f'{self.name}_bucket{_labels(self.labelnames, labels, [("le", le)])} {cumulative}'
+                )
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {n}')
+        return lines
+
+
+REQUESTS = Counter('http_requests_total', 'HTTP responses by route and status.',
+                   ('method', 'route', 'status'))
+REQUEST_SECONDS = Histogram('http_request_duration_seconds',
+                            'Time until the response (headers, for streams) was returned.',
+                            ('method', 'route'))
+STAGE_SECONDS = Histogram('app_stage_duration_seconds', 'Time spent in named view stages.',
+                          ('stage',))
+MONGO_SECONDS = Histogram('mongo_command_duration_seconds', 'MongoDB command round trips.',
+                          ('command', 'outcome'))
+GEMINI_SECONDS = Histogram('gemini_request_duration_seconds',
+                           'Gemini calls including retries, to the last chunk for streams.',
+                           ('call', 'outcome'))
+
+
+def render():
+    """Every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def _record(name, seconds):
+    timings = _timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+class stage:
+    """``with stage('encode'): ...`` times the block into ``app_stage_duration_seconds``."""
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.started
+        STAGE_SECONDS.observe(seconds, self.name)
+        _record(self.name, seconds)
+        return False
+
+
+def observe_gemini(call, outcome, seconds):
+    GEMINI_SECONDS.observe(seconds, call, outcome)
+    _record('gemini', seconds)
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """pymongo listener timing every command by name; pass it to ``connect``."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        seconds = event.duration_micros / 1e6
+        MONGO_SECONDS.observe(seconds, event.command_name, 'ok')
+        _record('mongo', seconds)
+
+    def failed(self, event):
+        seconds = event.duration_micros / 1e6
+        MONGO_SECONDS.observe(seconds, event.command_name, 'error')
+        _record('mongo', seconds)
+
+
+def server_timing(timings, total):
+    """``Server-Timing`` value: per-name sums of ``timings`` plus the total, in ms."""
+    sums = {}
+    for name, seconds in timings:
+        sums[name] = sums.get(name, 0.0) + seconds
+    parts = [f'{name};dur={seconds * 1000:.3f}' for name, seconds in sums.items()]
+    parts.append(f'total;dur={total * 1000:.3f}')
+    return ', '.join(parts)
+
+
+class MetricsMiddleware:
+    """Time each request and count its status under the matched URL pattern.
+
+    Routes are labelled with the pattern (``api/history/<str:user_id>/``), not
+    the path, so the label set stays bounded; unmatched paths share one label,
+    as do methods outside ``METHODS``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'METRICS_SERVER_TIMING', False)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        token = _timings.set([])
+        try:
+            response = self.get_response(request)
+            return self._finish(request, response, started)
+        finally:
+            _timings.reset(token)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        token = _timings.set([])
+        try:
+            response = await self.get_response(request)
+            return self._finish(request, response, started)
+        finally:
+            _timings.reset(token)
+
+    def _finish(self, request, response, started):
+        seconds = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match is not None else '<unmatched>'
+        method = request.method if request.method in METHODS else 'other'
+        REQUEST_SECONDS.observe(seconds, method, route)
+        REQUESTS.inc(method, route, str(response.status_code))
+        if self.server_timing:
+            response['Server-Timing'] = server_timing(_timings.get(), seconds)
+        return response
@@ -1,29 +1,24 @@
-import joblib
-import numpy as np
-import pandas as pd
+# core/ml_model.py
+# Convenience helpers over the model registry. Nothing is loaded here: the
+# artifacts come from the active version in core.registry, the same copies
+# core.views serves.
+from .registry import get_registry
 
-# Load all models and preprocessors
-limit_model = joblib.load('backend/core/MLModel/credit_limit_model.pkl')
-limit_preprocessor = joblib.load('backend/core/MLModel/limit_preprocessor.pkl')
-approval_model = joblib.load('backend/core/MLModel/approval_model.pkl')
-approval_preprocessor = joblib.load('backend/core/MLModel/approval_preprocessor.pkl')
 
 def predict_credit_limit(data):
     print("[ML_MODEL] Incoming data for prediction:", data)
-    df = pd.DataFrame([{
+    version = get_registry().active()
+    record = {
         "Income": data['Income'] * 1000,
         "Rating": data['Rating'],
         "Cards": data['Cards'],
         "Age": data['Age'],
-        "Education": data['Education'],
         "Balance": data['Balance'],
-        # "Student": int(data['Student']),
-        # "Married": int(data['Married'])
         "Ethnicity": data.get("Ethnicity", "Caucasian")  # <--- Add this default
-    }])
+    }
 
-    X_transformed = limit_preprocessor.transform(df)
-    credit_limit = limit_model.predict(X_transformed)[0]
+    X_transformed = version.encoders['limit'].encode(record)
+    credit_limit = float(version.forests['limit'].predict(X_transformed)[0])
 
     approval_probability = min(1.0, credit_limit / 20000)
 
@@ -33,7 +28,8 @@ def predict_credit_limit(data):
     }
 
 def predict_approval(data):
-    df = pd.DataFrame([{
+    version = get_registry().active()
+    record = {
         "Income": data['Income'] * 1000,  # Convert from thousands
         "Rating": data['Rating'],
         "Cards": data['Cards'],
@@ -43,9 +39,9 @@ def predict_approval(data):
         "Student": int(data['Student']),
         "Married": int(data['Married']),
         "Ethnicity": data.get("Ethnicity", "Caucasian")  # default fallback
-    }])
+    }
 
-    X_transformed = approval_preprocessor.transform(df)
-    prob = approval_model.predict_proba(X_transformed)[0][1]
+    X_transformed = version.encoders['approval'].encode(record)
+    prob = version.forests['approval'].predict_proba(X_transformed)[0][1]
 
-    return round(prob, 4)
+    return round(float(prob), 4)
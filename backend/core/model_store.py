@@ -0,0 +1,122 @@
+# core/model_store.py
+"""One place that loads the ML artifacts in ``MLModel/``.
+
+Each pickle is read at most once per process.  Forests are compiled once per
+pickle content and the node arrays are cached on disk as ``.npy`` files, which
+are then memory-mapped read-only: every worker process maps the same page
+cache pages instead of holding its own unpickled copy of the trees.  Compiled
+encoders are cached next to them as JSON, so once the cache is warm a worker
+loads a version without unpickling anything (or importing sklearn).
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+from .encoding import CompiledEncoder
+from .forest import CompiledForest
+
+
+def file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelStore:
+    """Memoised access to forests, preprocessors and encoders by artifact name.
+
+    ``forest('credit_limit_model')`` returns a ``CompiledForest`` mapped from
+    ``cache_dir``; the sklearn pickle is only unpickled when the cache entry
+    for its content hash does not exist yet (or via ``sklearn_model``).
+    """
+
+    def __init__(self, model_dir, cache_dir=None, mmap_mode='r'):
+        self.model_dir = str(model_dir)
+        self.cache_dir = str(cache_dir or os.path.join(self.model_dir, '.compiled'))
+        self.mmap_mode = mmap_mode
+        self._lock = threading.RLock()
+        self._loaded = {}
+
+    def path(self, name):
+        return os.path.join(self.model_dir, f'{name}.pkl')
+
+    def _memo(self, key, load):
+        with self._lock:
+            if key not in self._loaded:
+                self._loaded[key] = load()
+            return self._loaded[key]
+
+    def digest(self, name):
+        return self._memo(('digest', name), lambda: file_digest(self.path(name)))
+
+    def version(self, names):
+        """Short content hash identifying one set of artifacts."""
+        digest = hashlib.sha1()
+        for name in names:
+            digest.update(self.digest(name).encode())
+        return digest.hexdigest()[:12]
+
+    def _unpickle(self, name):
+        import joblib  # pulls in sklearn with the pickle; only on a cache miss
+        return joblib.load(self.path(name))
+
+    def sklearn_model(self, name):
+        return self._memo(('sklearn', name), lambda: self._unpickle(name))
+
+    def preprocessor(self, name):
+        return self._memo(('preprocessor', name), lambda: self._unpickle(name))
+
+    def encoder(self, name):
+        return self._memo(('encoder', name), lambda: self._load_encoder(name))
+
+    def _load_encoder(self, name):
+        target = os.path.join(self.cache_dir, f'{name}-{self.digest(name)[:16]}.json')
+        if os.path.exists(target):
+            with open(target) as fh:
+                return CompiledEncoder.from_dict(json.load(fh))
+        encoder = CompiledEncoder.from_preprocessor(self.preprocessor(name))
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(prefix=f'.{name}-', suffix='.json', dir=self.cache_dir)
+            with os.fdopen(fd, 'w') as fh:
+                json.dump(encoder.to_dict(), fh)
+            os.replace(tmp, target)
+        except OSError:
+            pass  # read-only cache dir: compile again next time
+        return encoder
+
+    def forest(self, name):
+        return self._memo(('forest', name), lambda: self._load_forest(name))
+
+    def _load_forest(self, name):
+        target = os.path.join(self.cache_dir, f'{name}-{self.digest(name)[:16]}')
+        if os.path.exists(os.path.join(target, 'meta.json')):
+            return CompiledForest.load(target, mmap_mode=self.mmap_mode)
+        forest = CompiledForest.from_sklearn(self._unpickle(name))
+        # compile into a temp dir and rename, so concurrent workers never
+        # map a half-written cache entry
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = tempfile.mkdtemp(prefix=f'.{name}-', dir=self.cache_dir)
+        except OSError:
+            return forest  # read-only cache dir: serve from memory, compile again next time
+        try:
+            forest.save(tmp)
+            os.replace(tmp, target)
+        except OSError:
+            # another process won the rename (use its copy), or the disk is full
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not os.path.exists(os.path.join(target, 'meta.json')):
+                return forest
+        return CompiledForest.load(target, mmap_mode=self.mmap_mode)
+
+    def reload(self):
+        """Forget everything loaded so the next access re-reads the artifacts."""
+        with self._lock:
+            self._loaded.clear()
+
@@ -8,6 +8,7 @@ class User(Document):
 # core/models_mongo.py
 
 from datetime import datetime
+from pymongo import UpdateOne
 from mongoengine import (
     Document, EmbeddedDocument,
     StringField, EmailField,
@@ -18,7 +19,7 @@ from mongoengine import (
 class UserProfile(Document):
     meta = {"collection": "user_profiles"}
     email = StringField(required=True, unique=True)
-    password = StringField(required=True)  # Note: In production, this should be properly hashed
+    password = StringField(required=True)  # Django password hash (see core/auth.py)
     dependent_count = IntField(default=0)
     education_level = StringField()
     income_category = StringField()
@@ -48,9 +49,79 @@ class Prediction(Document):
     features = EmbeddedDocumentField(Features, required=True)
     creditLimit = FloatField(required=True)
     approvalProbability = FloatField(required=True)
+    modelVersion = StringField()  # ModelVersion.label that served this prediction
     createdAt = DateTimeField(required=True)
 
     meta = {
         'collection': 'predictions',
-        'indexes': ['userId', 'createdAt']
+        # history pages walk a user's predictions newest first by (createdAt, _id)
+        'indexes': [('userId', '-createdAt', '-id'), 'createdAt']
     }
+
+
+class UserSummary(Document):
+    """Running totals of a user's predictions, kept current by ``apply_predictions``."""
+    userId = StringField(required=True, unique=True)
+    estimateCount = IntField(default=0)
+    latestCreditLimit = FloatField()
+    latestApprovalProbability = FloatField()
+    minCreditLimit = FloatField()
+    maxCreditLimit = FloatField()
+    firstEstimateAt = DateTimeField()
+    latestEstimateAt = DateTimeField()
+
+    # userId's unique index serves /api/summary/ lookups and the upserts
+    meta = {'collection': 'user_summaries'}
+
+    @classmethod
+    def apply_predictions(cls, raw_docs):
+        """Fold raw ``Prediction`` documents into their users' summaries.
+
+        One upsert per user, as a pipeline update so every field is computed
+        from the stored document in one atomic step: the count is added, the
+        limit range and dates are widened, and ``latest*`` are replaced only
+        when this batch's newest prediction is at least as new as the stored
+        ``latestEstimateAt``.  Batches may arrive out of order (one
+        write-behind queue per worker, or the synchronous fallback), and an
+        older batch never rolls the latest values back.
+        """
+        per_user = {}
+        for doc in raw_docs:
+            s = per_user.get(doc['userId'])
+            if s is None:
+                per_user[doc['userId']] = s = {
+                    'count': 0, 'min': doc['creditLimit'], 'max': doc['creditLimit'],
+                    'first': doc['createdAt'], 'latest': doc
+                }
+            s['count'] += 1
+            s['min'] = min(s['min'], doc['creditLimit'])
+            s['max'] = max(s['max'], doc['creditLimit'])
+            s['first'] = min(s['first'], doc['createdAt'])
+            if doc['createdAt'] >= s['latest']['createdAt']:
+                s['latest'] = doc
+        if not per_user:
+            return
+        cls._get_collection().bulk_write([
+            UpdateOne({'userId': user_id}, [{'$set': cls._fold(s)}], upsert=True)
+            for user_id, s in per_user.items()
+        ], ordered=False)
+
+    @staticmethod
+    def _fold(s):
+        # one $set stage: every expression reads the document as stored
+        latest = s['latest']
+        newer = {'$gte': [latest['createdAt'], {'$ifNull': ['$latestEstimateAt', datetime.min]}]}
+        return {
+            'estimateCount': {'$add': [{'$ifNull': ['$estimateCount', 0]}, s['count']]},
+            # $min/$max skip missing fields, so a new summary takes the batch's values
+            'minCreditLimit': {'$min': ['$minCreditLimit', s['min']]},
+            'maxCreditLimit': {'$max': ['$maxCreditLimit', s['max']]},
+            'firstEstimateAt': {'$min': ['$firstEstimateAt', s['first']]},
+            'latestEstimateAt': {'$max': ['$latestEstimateAt', latest['createdAt']]},
+            'latestCreditLimit': {
+                '$cond': [newer, latest['creditLimit'], '$latestCreditLimit']
+            },
+            'latestApprovalProbability': {
+                '$cond': [newer, latest['approvalProbability'], '$latestApprovalProbability']
+            },
+        }
@@ -0,0 +1,227 @@
+# core/persistence.py
+"""Write-behind buffer for ``Prediction`` documents.
+
+``credit_estimate`` hands its document to ``WriteBehindQueue.put`` and
+responds straight away; a background thread drains the buffer and writes it
+with one ``insert_many`` per batch when ``batch_size`` documents are waiting
+or ``flush_interval`` seconds have passed.  The buffer is bounded: when it is
+full ``put`` waits up to ``put_timeout`` for room (backpressure) and then
+falls back to a synchronous insert.  Failed batches are retried with backoff
+and finally appended to a JSON-lines dead-letter file so no estimate is lost
+silently.  Pending documents are flushed at interpreter exit.
+
+``on_written(raw_docs)`` runs on the writer thread after each successful
+insert, in insertion order; ``credit_estimate`` uses it to roll the batch
+into ``UserSummary``.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from bson import json_util
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """Buffer documents of one MongoEngine ``Document`` class and bulk insert them."""
+
+    def __init__(self, document_cls, batch_size=500, flush_interval=0.5, max_pending=10000,
+                 put_timeout=1.0, max_retries=3, retry_backoff=0.5, dead_letter_path=None,
+                 on_written=None):
+        self.document_cls = document_cls
+        self.on_written = on_written
+        self.batch_size = int(batch_size)
+        self.flush_interval = float(flush_interval)
+        self.max_pending = int(max_pending)
+        self.put_timeout = put_timeout
+        self.max_retries = int(max_retries)
+        self.retry_backoff = retry_backoff
+        self.dead_letter_path = dead_letter_path
+
+        self._queue = queue.Queue(maxsize=self.max_pending)
+        self._lock = threading.Lock()
+        self._worker = None
+        self._pid = None
+        self._closed = False
+        self._stopping = False
+
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.retries = 0
+        self.dead_lettered = 0
+        self.sync_fallbacks = 0
+
+    # — producer side —
+
+    def put(self, document):
+        """Queue ``document`` for insertion, blocking briefly if the buffer is full."""
+        if self.max_pending <= 0 or self._closed:
+            # write-behind disabled (or shutting down): write through
+            self._write_now([document])
+            return
+        self._ensure_worker()
+        try:
+            self._queue.put(document.to_mongo(), timeout=self.put_timeout)
+            self.enqueued += 1
+        except queue.Full:
+            # backpressure didn't clear in time; don't drop the estimate
+            self.sync_fallbacks += 1
+            self._write_now([document])
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been written or dead-lettered."""
+        if self._worker is None or self._pid != os.getpid():
+            return
+        self._queue.join() if timeout is None else self._join(timeout)
+
+    def close(self, timeout=10.0):
+        """Flush and stop the worker (called at exit)."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self._worker is not None and self._pid == os.getpid():
+            self._queue.put(_STOP)
+            self._worker.join(timeout)
+            # anything that raced in behind the stop marker is written here
+            leftovers = []
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP:
+                    leftovers.append(item)
+                self._queue.task_done()
+            if leftovers:
+                self._insert_with_retry(leftovers)
+
+    def stats(self):
+        return {
+            'pending': self._queue.qsize(),
+            'max_pending': self.max_pending,
+            'batch_size': self.batch_size,
+            'flush_interval': self.flush_interval,
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'batches': self.batches,
+            'retries': self.retries,
+            'dead_lettered': self.dead_lettered,
+            'sync_fallbacks': self.sync_fallbacks,
+        }
+
+    # — worker —
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker is None or self._pid != os.getpid():
+                if self._pid is not None:
+                    # forked child: the parent's buffered documents are the parent's job
+                    self._queue = queue.Queue(maxsize=self.max_pending)
+                self._pid = os.getpid()
+                self._worker = threading.Thread(
+                    target=self._run, name='prediction-write-behind', daemon=True
+                )
+                self._worker.start()
+                atexit.register(self.close)
+
+    def _join(self, timeout):
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _take_batch(self):
+        """Wait for one document, then gather more until full or the interval passes."""
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # write what we have, then stop
+                self._stopping = True
+                self._queue.task_done()
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                self._queue.task_done()
+                return
+            try:
+                self._insert_with_retry(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if self._stopping:
+                return
+
+    def _insert_with_retry(self, raw_docs):
+        collection = self.document_cls._get_collection()
+        for attempt in range(self.max_retries + 1):
+            try:
+                # ordered=False: one bad document doesn't block the rest of the batch
+                collection.insert_many(raw_docs, ordered=False)
+                self.written += len(raw_docs)
+                self.batches += 1
+                self._after_write(raw_docs)
+                return
+            except Exception as e:
+                # retrying a partially applied batch could duplicate documents,
+                # so only whole-batch failures are retried
+                inserted = getattr(e, 'details', {}) or {}
+                if inserted.get('nInserted'):
+                    failed = {err['index'] for err in inserted.get('writeErrors', [])}
+                    self.written += inserted['nInserted']
+                    self._dead_letter([d for i, d in enumerate(raw_docs) if i in failed], e)
+                    self._after_write([d for i, d in enumerate(raw_docs) if i not in failed])
+                    return
+                if attempt == self.max_retries:
+                    self._dead_letter(raw_docs, e)
+                    return
+                self.retries += 1
+                logger.warning('prediction insert_many failed (attempt %d): %s', attempt + 1, e)
+                time.sleep(self.retry_backoff * (2 ** attempt))
+
+    def _after_write(self, raw_docs):
+        if self.on_written is None:
+            return
+        try:
+            self.on_written(raw_docs)
+        except Exception:
+            # the documents themselves are stored; don't retry or dead-letter them
+            logger.exception('on_written hook failed for %d document(s)', len(raw_docs))
+
+    def _write_now(self, documents):
+        self._insert_with_retry([d.to_mongo() for d in documents])
+
+    def _dead_letter(self, raw_docs, error):
+        self.dead_lettered += len(raw_docs)
+        logger.error('dead-lettering %d prediction(s): %s', len(raw_docs), error)
+        if not self.dead_letter_path:
+            return
+        with self._lock:
+            with open(self.dead_letter_path, 'a') as fh:
+                for doc in raw_docs:
+                    fh.write(json.dumps(doc, default=json_util.default) + '\n')
@@ -0,0 +1,302 @@
+# core/registry.py
+"""Versioned model bundles with atomic hot swap.
+
+A *version* is a directory holding the six artifacts the training notebook
+writes (limit, approval and score models plus their preprocessors).  The
+built-in ``MLModel/`` directory is the ``default`` version; retrained bundles
+go in ``MODEL_VERSIONS_DIR/<name>/``.
+
+``ModelRegistry.activate`` loads and verifies a whole bundle before swapping
+a single reference, so requests in flight finish on the version they started
+with and new requests see the new one.  The active version name is also
+written to ``MODEL_VERSIONS_DIR/ACTIVE``; other worker processes notice the
+change within ``poll_seconds`` and swap themselves.
+"""
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from django.conf import settings
+
+from .batching import MicroBatcher
+from .encoding import SharedEncoder
+from .model_store import ModelStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VERSION = 'default'
+ACTIVE_FILE = 'ACTIVE'
+
+# kind -> (model artifact, preprocessor artifact)
+ARTIFACTS = {
+    'limit':    ('credit_limit_model', 'limit_preprocessor'),
+    'approval': ('approval_model', 'approval_preprocessor'),
+    'score':    ('credit_score_model', 'score_preprocessor'),
+}
+
+# a plausible applicant every version must be able to score
+PROBE = {
+    'Income': 50000, 'Rating': 400, 'Cards': 2, 'Age': 40, 'Balance': 300,
+    'Education': 14, 'Student': 0, 'Married': 1, 'Gender': 1, 'Ethnicity': 'Caucasian',
+}
+
+
+class ModelVersionError(Exception):
+    """A model bundle is missing, unreadable or fails verification."""
+
+
+class ModelVersion:
+    """One loaded, verified bundle of forests, encoders and batchers."""
+
+    def __init__(self, name, model_dir, cache_dir=None, max_batch_size=32, max_wait_ms=2.0):
+        self.name = name
+        self.model_dir = str(model_dir)
+        store = ModelStore(model_dir, cache_dir)
+        try:
+            self.digest = store.version([a for pair in ARTIFACTS.values() for a in pair])
+            self.forests = {kind: store.forest(model) for kind, (model, _) in ARTIFACTS.items()}
+            self.encoders = {kind: store.encoder(pre) for kind, (_, pre) in ARTIFACTS.items()}
+            # one parse of an applicant feeds all three models (/api/assess/),
+            # or just limit and approval (/api/whatif/, which has no Gender)
+            self.shared_encoder = SharedEncoder(self.encoders)
+            self.estimate_encoder = SharedEncoder(
+                {kind: self.encoders[kind] for kind in ('limit', 'approval')}
+            )
+        except Exception as e:
+            raise ModelVersionError(f'cannot load model version {name!r}: {e}') from e
+        self.verify()
+        self.loaded_at = datetime.utcnow()
+
+        # — per-version batchers, so a batch never mixes rows from two versions —
+        self.limit_batcher = MicroBatcher(
+            self.forests['limit'].predict,
+            max_batch_size=max_batch_size, max_wait_ms=max_wait_ms, name='limit'
+        )
+        self.approval_batcher = MicroBatcher(
+            lambda X: self.forests['approval'].predict_proba(X)[:, 1],
+            max_batch_size=max_batch_size, max_wait_ms=max_wait_ms, name='approval'
+        )
+        self.assess_batcher = MicroBatcher(
+            self.assess,
+            max_batch_size=max_batch_size, max_wait_ms=max_wait_ms, name='assess'
+        )
+
+    @property
+    def label(self):
+        """``name@digest``, recorded on every stored prediction."""
+        return f'{self.name}@{self.digest}'
+
+    def assess(self, X):
+        """``(rows, 3)`` of limit, approval probability and score for shared-encoded ``X``."""
+        inputs = self.shared_encoder.split(X)
+        return np.column_stack([
+            self.forests['limit'].predict(inputs['limit']),
+            self.forests['approval'].predict_proba(inputs['approval'])[:, 1],
+            self.forests['score'].predict(inputs['score']),
+        ])
+
+    def verify(self):
+        """Check each model/preprocessor pair fits together and can score ``PROBE``."""
+        for kind, (model, pre) in ARTIFACTS.items():
+            forest, encoder = self.forests[kind], self.encoders[kind]
+            if encoder.n_features != forest.n_features:
+                raise ModelVersionError(
+                    f'{self.name}: {pre} produces {encoder.n_features} features '
+                    f'but {model} expects {forest.n_features}'
+                )
+            x = encoder.encode(PROBE)
+            if forest.is_classifier:
+                if list(forest.classes) != [0, 1]:
+                    raise ModelVersionError(f'{self.name}: {model} must be a binary 0/1 classifier')
+                out = float(forest.predict_proba(x)[0, 1])
+                ok = 0.0 <= out <= 1.0
+            else:
+                out = float(forest.predict(x)[0])
+                ok = math.isfinite(out)
+            if not ok:
+                raise ModelVersionError(f'{self.name}: {model} returned {out!r} for the probe applicant')
+            if not np.array_equal(self.shared_encoder.split(self.shared_encoder.encode(PROBE))[kind], x):
+                raise ModelVersionError(f'{self.name}: shared encoding differs from {pre}')
+
+    def warm_up(self, batch_sizes=(1, 32)):
+        """Push the probe applicant through every prediction path once.
+
+        Runs on the calling thread (not the batchers, whose threads must not
+        exist before a fork), so the first real request doesn't pay for
+        first-touch page faults on the mapped arrays and NumPy's first-call setup.
+        """
+        for rows in batch_sizes:
+            X = self.shared_encoder.encode_many([PROBE] * rows)
+            self.assess(X)
+            self.forests['limit'].predict_interval(self.shared_encoder.split(X)['limit'])
+
+    def close(self):
+        self.limit_batcher.close()
+        self.approval_batcher.close()
+        self.assess_batcher.close()
+
+    def describe(self):
+        return {
+            'name': self.name,
+            'label': self.label,
+            'path': self.model_dir,
+            'loaded_at': self.loaded_at.isoformat(),
+        }
+
+
+class ModelRegistry:
+    """Lists model versions on disk and serves the active one."""
+
+    def __init__(self, default_dir, versions_dir, cache_dir=None,
+                 max_batch_size=32, max_wait_ms=2.0, poll_seconds=2.0):
+        self.default_dir = str(default_dir)
+        self.versions_dir = str(versions_dir)
+        self.cache_dir = cache_dir
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.poll_seconds = poll_seconds
+
+        self._active = None
+        self._load_lock = threading.Lock()
+        self._listeners = []
+        self._next_poll = 0.0
+        self._active_file_mtime = None
+
+    # — discovery —
+
+    def available(self):
+        """``{name: directory}`` for every version on disk."""
+        versions = {DEFAULT_VERSION: self.default_dir}
+        if os.path.isdir(self.versions_dir):
+            for entry in sorted(os.listdir(self.versions_dir)):
+                path = os.path.join(self.versions_dir, entry)
+                if os.path.isdir(path) and not entry.startswith('.'):
+                    versions[entry] = path
+        return versions
+
+    def list(self):
+        active = self._active
+        rows = []
+        for name, path in self.available().items():
+            row = {'name': name, 'path': path, 'active': False}
+            if active is not None and active.name == name:
+                row.update(active=True, **active.describe())
+            rows.append(row)
+        return rows
+
+    # — serving —
+
+    def add_listener(self, fn):
+        """Call ``fn(version)`` after every swap (e.g. to drop cached outputs)."""
+        self._listeners.append(fn)
+
+    def active(self):
+        """The version to serve this request with. Loads the pinned one on first use."""
+        if self._active is None:
+            with self._load_lock:
+                if self._active is None:
+                    self._swap(self._load(self._pinned_name()))
+        elif time.monotonic() >= self._next_poll:
+            self._follow_active_file()
+        return self._active
+
+    def loaded(self):
+        """The active version if one has been loaded, else ``None`` (never loads)."""
+        return self._active
+
+    def activate(self, name, persist=True):
+        """Load, verify and atomically switch to version ``name``."""
+        with self._load_lock:
+            version = self._load(name)
+            self._swap(version)
+            if persist:
+                self._write_active_file(name)
+        return version
+
+    def pinned_name(self):
+        """Name of the version ``ACTIVE`` points at, without loading it."""
+        return self._pinned_name()
+
+    # — internals —
+
+    def _load(self, name):
+        path = self.available().get(name)
+        if path is None:
+            raise KeyError(name)
+        return ModelVersion(
+            name, path, self.cache_dir,
+            max_batch_size=self.max_batch_size, max_wait_ms=self.max_wait_ms
+        )
+
+    def _swap(self, version):
+        previous, self._active = self._active, version
+        for fn in self._listeners:
+            fn(version)
+        if previous is not None:
+            previous.close()
+        logger.info('serving model version %s', version.label)
+
+    def _active_file(self):
+        return os.path.join(self.versions_dir, ACTIVE_FILE)
+
+    def _pinned_name(self):
+        try:
+            self._active_file_mtime = os.stat(self._active_file()).st_mtime_ns
+            with open(self._active_file()) as fh:
+                name = fh.read().strip()
+        except OSError:
+            return DEFAULT_VERSION
+        return name if name in self.available() else DEFAULT_VERSION
+
+    def _write_active_file(self, name):
+        os.makedirs(self.versions_dir, exist_ok=True)
+        tmp = self._active_file() + '.tmp'
+        with open(tmp, 'w') as fh:
+            fh.write(name + '\n')
+        os.replace(tmp, self._active_file())
+        self._active_file_mtime = os.stat(self._active_file()).st_mtime_ns
+
+    def _follow_active_file(self):
+        # another worker activated a version: swap here too, without making
+        # concurrent requests wait for the load
+        self._next_poll = time.monotonic() + self.poll_seconds
+        try:
+            mtime = os.stat(self._active_file()).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._active_file_mtime or not self._load_lock.acquire(blocking=False):
+            return
+        try:
+            name = self._pinned_name()
+            if name != self._active.name:
+                self._swap(self._load(name))
+        except (KeyError, ModelVersionError):
+            logger.exception('could not follow model version change; still serving %s',
+                             self._active.label)
+        finally:
+            self._load_lock.release()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Process-wide registry configured from settings."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry(
+                    settings.MODEL_DIR,
+                    settings.MODEL_VERSIONS_DIR,
+                    settings.MODEL_CACHE_DIR,
+                    max_batch_size=settings.INFERENCE_MAX_BATCH_SIZE,
+                    max_wait_ms=settings.INFERENCE_MAX_WAIT_MS,
+                    poll_seconds=settings.MODEL_REGISTRY_POLL_SECONDS,
+                )
+    return _registry
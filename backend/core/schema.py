@@ -0,0 +1,196 @@
+# core/schema.py
+"""Declarative validation of applicant records.
+
+``APPLICANT`` describes every applicant field once: its type, lower bound
+and default.  ``APPLICANT.compile(names)`` builds (and caches) a
+``Validator`` for one set of fields, for example a model's encoder columns.
+It holds a key index that accepts ``Income`` or any other casing of it, plus
+one coercion per field, so validating a request is one pass over its keys.
+Every failing field is collected before ``SchemaError`` is raised, so a 400
+can list them all.
+"""
+import math
+import threading
+
+_TRUE = frozenset(('yes', 'true', '1', 'y'))
+_FALSE = frozenset(('no', 'false', '0', 'n'))
+
+
+class SchemaError(ValueError):
+    """The record failed validation; ``errors`` maps field name to message."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('; '.join(f'{name} {message}' for name, message in errors.items()))
+
+
+# — coercions: return the clean value or raise ValueError(message) —
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError('must be a number')
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError('must be a number')
+    if not math.isfinite(number):
+        raise ValueError('must be a finite number')
+    return number
+
+
+def _integer(value):
+    number = _number(value)
+    if not number.is_integer():
+        raise ValueError('must be a whole number')
+    return int(number)
+
+
+def _boolean(value):
+    # JSON booleans, 0/1, and the "Yes"/"No" strings used in credit.csv
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in _TRUE:
+            return True
+        if text in _FALSE:
+            return False
+    raise ValueError('must be true/false or yes/no')
+
+
+def _gender(value):
+    # credit.csv uses "Male"/"Female"; the score model was trained on Male=1
+    if isinstance(value, str) and value.strip().lower() in ('male', 'female'):
+        return int(value.strip().lower() == 'male')
+    try:
+        return int(_boolean(value))
+    except ValueError:
+        raise ValueError('must be Male or Female')
+
+
+def _string(value):
+    if not isinstance(value, str):
+        raise ValueError('must be a string')
+    return value
+
+
+COERCIONS = {
+    'number': _number,
+    'integer': _integer,
+    'boolean': _boolean,
+    'gender': _gender,
+    'string': _string,
+}
+
+
+class Field:
+    """One field: ``kind`` is a key of ``COERCIONS``; a field with a
+    ``default`` is optional, every other field is required."""
+    __slots__ = ('name', 'kind', 'minimum', 'default', 'coerce')
+
+    def __init__(self, name, kind, minimum=None, default=None):
+        self.name = name
+        self.kind = kind
+        self.minimum = minimum
+        self.default = default
+        self.coerce = self._compile(COERCIONS[kind], minimum)
+
+    @staticmethod
+    def _compile(coerce, minimum):
+        if minimum is None:
+            return coerce
+
+        def coerce_with_minimum(value):
+            value = coerce(value)
+            if value < minimum:
+                raise ValueError(f'must be at least {minimum}')
+            return value
+        return coerce_with_minimum
+
+
+class Validator:
+    """Validates records against a fixed set of fields; see ``Schema.compile``."""
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.index = {field.name: field for field in self.fields}
+        self.folded = {field.name.lower(): field for field in self.fields}
+        self.required = tuple(field.name for field in self.fields if field.default is None)
+        self.defaults = tuple(
+            (field.name, field.default) for field in self.fields if field.default is not None
+        )
+
+    def validate(self, record):
+        """Clean ``{field: value}`` for ``record``; raises ``SchemaError``.
+
+        Unknown keys are ignored and ``null`` counts as missing.  When a
+        record has both ``Income`` and ``income``, the exact name wins.
+        """
+        if not isinstance(record, dict):
+            raise SchemaError({'record': 'must be a JSON object'})
+        index, folded = self.index, self.folded
+        clean, errors = {}, {}
+        for key, value in record.items():
+            field = index.get(key)
+            if field is None:
+                field = folded.get(key.lower()) if isinstance(key, str) else None
+                if field is None or field.name in record:
+                    continue
+            if value is None:
+                continue
+            try:
+                clean[field.name] = field.coerce(value)
+            except ValueError as e:
+                errors[field.name] = str(e)
+        for name in self.required:
+            if name not in clean and name not in errors:
+                errors[name] = 'is required'
+        if errors:
+            raise SchemaError(errors)
+        for name, default in self.defaults:
+            if name not in clean:
+                clean[name] = default
+        return clean
+
+
+class Schema:
+    def __init__(self, fields):
+        self.fields = {field.name: field for field in fields}
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    def compile(self, names):
+        """The (cached) ``Validator`` for the fields ``names``, in that order."""
+        key = tuple(names)
+        validator = self._compiled.get(key)
+        if validator is None:
+            try:
+                fields = [self.fields[name] for name in key]
+            except KeyError as e:
+                raise ValueError(f'{e.args[0]!r} is not an applicant field')
+            with self._lock:
+                validator = self._compiled.setdefault(key, Validator(fields))
+        return validator
+
+    def validate(self, record, names):
+        return self.compile(names).validate(record)
+
+
+APPLICANT = Schema([
+    Field('Income', 'number', minimum=0),
+    Field('Rating', 'number', minimum=0),
+    Field('Cards', 'integer', minimum=0),
+    Field('Age', 'integer', minimum=0),
+    Field('Balance', 'number', minimum=0),
+    Field('Education', 'integer', minimum=0),
+    Field('Student', 'boolean'),
+    Field('Married', 'boolean'),
+    Field('Ethnicity', 'string', default='Not Specified'),
+    Field('Gender', 'gender'),
+])
+
+# the fields stored on every Prediction (core.models_mongo.Features)
+FEATURE_FIELDS = ('Income', 'Rating', 'Cards', 'Age', 'Balance', 'Education',
+                  'Student', 'Married', 'Ethnicity')
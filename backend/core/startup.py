@@ -0,0 +1,32 @@
+# core/startup.py
+"""Work the server entrypoints do once, before serving (and before forking).
+
+``banking_backend.wsgi`` and ``banking_backend.asgi`` call ``warm_up`` after
+building the application, so with a pre-forking server (``preload_app`` in
+``gunicorn.conf.py``) the models are loaded, verified and warmed once in the
+master and every worker inherits them.  Management commands never import
+those modules and so skip the models unless they ask for them.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.urls import get_resolver
+
+from .registry import get_registry
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    # import the URLconf (and with it core.views) here rather than on the
+    # first request each worker serves
+    get_resolver().url_patterns
+    if not settings.MODEL_WARM_UP:
+        return None
+    started = time.perf_counter()
+    version = get_registry().active()
+    version.warm_up()
+    logger.info('model version %s loaded and warmed in %.0f ms',
+                version.label, (time.perf_counter() - started) * 1000)
+    return version
@@ -0,0 +1,386 @@
+# core/tests.py
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from unittest import mock
+
+import httpx
+import mongoengine
+import mongomock
+from asgiref.sync import async_to_sync
+import numpy as np
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.test import SimpleTestCase, override_settings
+from mongoengine import Document, IntField
+from pymongo.errors import AutoReconnect, OperationFailure
+
+from core import views
+from core import metrics
+from core.batching import MicroBatcher
+from core.gemini import GeminiClient, GeminiError
+from core.model_store import ModelStore
+from core.models_mongo import Prediction, UserProfile, UserSummary
+from core.persistence import WriteBehindQueue
+
+
+class Entry(Document):
+    n = IntField()
+    meta = {'collection': 'write_behind_entries'}
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class MongomockTestCase(SimpleTestCase):
+    """Runs against an in-memory mongomock database; no MongoDB server needed."""
+    documents = ()
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        mongoengine.disconnect()
+        mongoengine.connect('core-tests', mongo_client_class=mongomock.MongoClient)
+
+    @classmethod
+    def tearDownClass(cls):
+        mongoengine.disconnect()
+        super().tearDownClass()
+
+    def setUp(self):
+        for document in self.documents:
+            document._collection = None
+            document.drop_collection()
+
+
+class WriteBehindQueueTests(MongomockTestCase):
+    documents = (Entry,)
+
+    def setUp(self):
+        super().setUp()
+        self.queues = []
+
+    def tearDown(self):
+        for q in self.queues:
+            q.close()
+
+    def make_queue(self, **kwargs):
+        q = WriteBehindQueue(Entry, **kwargs)
+        self.queues.append(q)
+        return q
+
+    def stored(self):
+        return sorted(doc['n'] for doc in Entry._get_collection().find())
+
+    def test_flushes_when_batch_is_full(self):
+        q = self.make_queue(batch_size=3, flush_interval=30)
+        for n in range(3):
+            q.put(Entry(n=n))
+        # long before the 30 s interval
+        self.assertTrue(_wait_for(lambda: q.written == 3))
+        self.assertEqual(q.batches, 1)
+        self.assertEqual(self.stored(), [0, 1, 2])
+
+    def test_flushes_after_interval(self):
+        q = self.make_queue(batch_size=100, flush_interval=0.05)
+        q.put(Entry(n=1))
+        q.put(Entry(n=2))
+        self.assertTrue(_wait_for(lambda: q.written == 2))
+        self.assertEqual(q.batches, 1)
+        self.assertEqual(self.stored(), [1, 2])
+
+    def test_full_buffer_falls_back_to_synchronous_write(self):
+        # hold the writer thread inside on_written so the one-slot buffer stays full
+        gate = threading.Event()
+
+        def hold_writer(raw_docs):
+            if threading.current_thread().name == 'prediction-write-behind':
+                gate.wait(5)
+
+        q = self.make_queue(batch_size=1, flush_interval=0.01, max_pending=1,
+                            put_timeout=0.01, on_written=hold_writer)
+        q.put(Entry(n=1))
+        self.assertTrue(_wait_for(lambda: q.written == 1))
+        q.put(Entry(n=2))  # fills the buffer
+        q.put(Entry(n=3))  # no room: written on this thread
+        self.assertEqual(q.sync_fallbacks, 1)
+        self.assertEqual(self.stored(), [1, 3])
+
+        gate.set()
+        q.flush(timeout=2)
+        self.assertEqual(self.stored(), [1, 2, 3])
+
+    def test_retries_a_failed_batch(self):
+        insert_many = mongomock.Collection.insert_many
+        calls = []
+
+        def fail_once(collection, *args, **kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                raise AutoReconnect('connection reset')
+            return insert_many(collection, *args, **kwargs)
+
+        q = self.make_queue(max_pending=0, retry_backoff=0)
+        with mock.patch.object(mongomock.Collection, 'insert_many', fail_once), \
+                self.assertLogs('core.persistence', 'WARNING'):
+            q.put(Entry(n=1))
+        self.assertEqual((q.retries, q.written, q.dead_lettered), (1, 1, 0))
+        self.assertEqual(self.stored(), [1])
+
+    def test_dead_letters_after_the_last_retry(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'dead.jsonl')
+            q = self.make_queue(max_pending=0, max_retries=2, retry_backoff=0,
+                                dead_letter_path=path)
+            with mock.patch.object(mongomock.Collection, 'insert_many',
+                                   side_effect=AutoReconnect('down')) as insert_many, \
+                    self.assertLogs('core.persistence', 'WARNING') as logs:
+                q.put(Entry(n=7))
+            self.assertIn('dead-lettering 1 prediction(s)', logs.output[-1])
+            self.assertEqual(insert_many.call_count, 3)
+            self.assertEqual((q.retries, q.written, q.dead_lettered), (2, 0, 1))
+            with open(path) as fh:
+                lines = [json.loads(line) for line in fh]
+        self.assertEqual([line['n'] for line in lines], [7])
+        self.assertEqual(self.stored(), [])
+
+    def test_close_writes_pending_documents(self):
+        q = self.make_queue(batch_size=100, flush_interval=30)
+        for n in range(5):
+            q.put(Entry(n=n))
+        q.close()
+        self.assertEqual(q.written, 5)
+        self.assertEqual(self.stored(), [0, 1, 2, 3, 4])
+
+
+@override_settings(MODEL_ADMIN_TOKEN='admin')
+class UserExportTests(MongomockTestCase):
+    documents = (UserProfile,)
+
+    def setUp(self):
+        super().setUp()
+        UserProfile._get_collection().insert_many([
+            {'email': f'user{i}@example.com', 'password': 'x', 'created_at': datetime(2025, 1, 1)}
+            for i in range(250)
+        ])
+
+    def export(self, reads):
+        """Drive the ASGI app; return the read count seen at each body chunk, and the body."""
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': '/api/users/',
+            'raw_path': b'/api/users/', 'query_string': b'format=ndjson', 'root_path': '',
+            'headers': [(b'host', b'localhost'), (b'x-admin-token', b'admin')],
+            'client': ('127.0.0.1', 1234), 'server': ('localhost', 80),
+        }
+        seen, body = [], []
+        messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            # the client stays connected; Django cancels this when the response is done
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                self.assertEqual(message['status'], 200)
+            elif message.get('body'):
+                seen.append(len(reads))
+                body.append(message['body'])
+
+        asyncio.run(get_asgi_application()(scope, receive, send))
+        return seen, b''.join(body)
+
+    def test_ndjson_export_streams_one_batch_at_a_time(self):
+        read = views._read_users_after
+        reads = []
+
+        def counting_read(last_id):
+            reads.append(last_id)
+            return read(last_id)
+
+        with mock.patch.object(views, 'USERS_EXPORT_BATCH_SIZE', 100), \
+                mock.patch.object(views, '_read_users_after', counting_read):
+            seen, body = self.export(reads)
+
+        # each chunk goes out before the next batch is read
+        self.assertEqual(seen, [1, 2, 3])
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual(len(rows), 250)
+        self.assertEqual(len({row['id'] for row in rows}), 250)
+
+
+class MicroBatcherTests(SimpleTestCase):
+
+    def test_lone_row_does_not_wait_for_a_batch(self):
+        batcher = MicroBatcher(lambda X: X.sum(axis=1), max_batch_size=32, max_wait_ms=1000)
+        self.addCleanup(batcher.close)
+        started = time.perf_counter()
+        self.assertEqual(batcher.submit([1.0, 2.0]), 3.0)
+        self.assertLess(time.perf_counter() - started, 0.5)
+
+    def test_rows_queued_behind_a_running_batch_are_batched(self):
+        running, release = threading.Event(), threading.Event()
+
+        def predict(X):
+            running.set()
+            release.wait(5)
+            return X.sum(axis=1)
+
+        batcher = MicroBatcher(predict, max_batch_size=32, max_wait_ms=50)
+        self.addCleanup(batcher.close)
+        results = {}
+
+        def submit(i):
+            results[i] = batcher.submit([float(i)])
+
+        threads = [threading.Thread(target=submit, args=(0,))]
+        threads[0].start()
+        self.assertTrue(running.wait(5))
+        for i in range(1, 6):
+            threads.append(threading.Thread(target=submit, args=(i,)))
+            threads[-1].start()
+        self.assertTrue(_wait_for(lambda: batcher.stats()['queue_depth'] == 5))
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(results, {i: float(i) for i in range(6)})
+        self.assertEqual(batcher.stats()['batch_size_histogram'], {'1': 1, '5': 1})
+
+
+class EstimateBatchPersistTests(MongomockTestCase):
+    documents = (Prediction, UserSummary)
+    applicant = {'Income': 50000, 'Rating': 400, 'Cards': 2, 'Age': 40, 'Balance': 300,
+                 'Education': 14, 'Student': 'No', 'Married': 'Yes', 'Ethnicity': 'Caucasian'}
+
+    def post_batch(self):
+        records = [self.applicant, {**self.applicant, 'Income': -1}, self.applicant]
+        return self.client.post('/api/estimate/batch/', {'records': records, 'persist': True,
+                                                         'userId': 'batch-user'},
+                                content_type='application/json')
+
+    def test_persisted_rows_are_folded_into_the_summary(self):
+        with mock.patch.object(UserSummary, 'apply_predictions') as apply_predictions:
+            response = self.post_batch()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['persisted'], 2)
+        self.assertEqual(Prediction.objects(userId='batch-user').count(), 2)
+        (raw_docs,), _ = apply_predictions.call_args
+        self.assertEqual([doc['userId'] for doc in raw_docs], ['batch-user', 'batch-user'])
+
+    def test_summary_failure_still_reports_the_stored_rows(self):
+        with mock.patch.object(UserSummary, 'apply_predictions',
+                               side_effect=OperationFailure('summary upsert failed')), \
+                self.assertLogs('core.views', 'ERROR'):
+            response = self.post_batch()
+        # a 500 would invite a retry that stores the rows twice
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['persisted'], 2)
+        self.assertEqual(Prediction.objects(userId='batch-user').count(), 2)
+
+
+class ModelStoreTests(SimpleTestCase):
+
+    def test_unwritable_cache_dir_serves_from_memory(self):
+        with tempfile.NamedTemporaryFile() as blocker:
+            # a directory under a regular file can never be created
+            store = ModelStore(settings.MODEL_DIR, os.path.join(blocker.name, 'cache'))
+            forest = store.forest('credit_limit_model')
+            encoder = store.encoder('limit_preprocessor')
+
+        X = np.zeros((2, encoder.n_features))
+        cached = ModelStore(settings.MODEL_DIR, settings.MODEL_CACHE_DIR)
+        np.testing.assert_array_equal(forest.predict(X), cached.forest('credit_limit_model').predict(X))
+
+
+def _sse_body(*chunks):
+    return ''.join(f'data: {chunk}\r\n\r\n' for chunk in chunks).encode()
+
+
+def _text_chunk(text):
+    return json.dumps({'candidates': [{'content': {'parts': [{'text': text}]}}]})
+
+
+class GeminiStreamTests(SimpleTestCase):
+
+    def gemini(self, body):
+        transport = httpx.MockTransport(lambda request: httpx.Response(
+            200, content=body, headers={'content-type': 'text/event-stream'}
+        ))
+        return GeminiClient('key', 'http://gemini.test', 'model', max_retries=0, transport=transport)
+
+    def collect(self, client):
+        async def run():
+            texts = []
+            try:
+                async for text in client.stream('prompt'):
+                    texts.append(text)
+            finally:
+                await client.aclose()
+            return texts
+        return asyncio.run(run())
+
+    def test_chunks_without_text_are_skipped(self):
+        client = self.gemini(_sse_body(
+            _text_chunk('Hello'),
+            json.dumps({'candidates': [{'finishReason': 'STOP'}]}),
+        ))
+        self.assertEqual(self.collect(client), ['Hello'])
+
+    def test_blocked_prompt_is_an_error(self):
+        client = self.gemini(_sse_body(json.dumps({'promptFeedback': {'blockReason': 'SAFETY'}})))
+        with self.assertRaisesRegex(GeminiError, 'SAFETY'):
+            self.collect(client)
+
+    def test_malformed_chunk_ends_the_view_stream_with_an_error_event(self):
+        client = self.gemini(_sse_body(_text_chunk('Hello'), '{not json'))
+
+        async def run():
+            events = [event async for event in views._chatbot_event_stream('prompt')]
+            await client.aclose()
+            return events
+
+        with mock.patch.object(views, 'get_gemini_client', return_value=client):
+            events = asyncio.run(run())
+        self.assertTrue(events[0].startswith('event: chunk'))
+        self.assertTrue(events[-1].startswith('event: error'))
+        self.assertIn('Malformed Gemini stream chunk', events[-1])
+
+    def test_client_of_a_finished_loop_is_closed(self):
+        gemini = self.gemini(_sse_body(_text_chunk('Hello')))
+
+        async def ask():
+            return [text async for text in gemini.stream('prompt')]
+
+        # how WSGI runs an async view: a fresh event loop per request
+        clients = []
+        for _ in range(2):
+            self.assertEqual(async_to_sync(ask)(), ['Hello'])
+            clients.extend(state[0] for state in gemini._per_loop.values() if state[0] not in clients)
+        self.assertEqual(len(clients), 2)
+        self.assertTrue(all(client.is_closed for client in clients))
+        # the first request's entry is dropped once its loop is gone
+        self.assertEqual(len(gemini._per_loop), 1)
+
+
+class MetricsMiddlewareTests(SimpleTestCase):
+
+    def test_unknown_methods_share_one_label(self):
+        for method in ('BREW', 'PROPFIND', 'get2'):
+            self.client.generic(method, '/api/')
+        counted = {labels[0] for labels in metrics.REQUESTS._values}
+        self.assertIn('other', counted)
+        self.assertFalse(counted & {'BREW', 'PROPFIND', 'get2'})
+
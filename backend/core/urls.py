@@ -1,18 +1,28 @@
 from django.urls import path
 from .views import ( list_users, limit_view, 
-approval_view, credit_estimate, get_user_history,
-user_setup, signin_view, signup_view, ai_chatbot, financial_insight
+approval_view, credit_estimate, credit_estimate_batch, get_user_history,
+user_setup, signin_view, signup_view, ai_chatbot, financial_insight,
+inference_stats, model_versions, insight_stats, get_user_summary,
+token_refresh, assess_view, whatif_view
 )
 
 urlpatterns = [
     path('users/',     list_users,     name='list_users'),
     path('signup/',    signup_view,    name='signup'),
     path('signin/',    signin_view,    name='signin'),
+    path('token/refresh/', token_refresh, name='token_refresh'),
     path('limit/',     limit_view,     name='credit_limit'),
     path('approval/',  approval_view,  name='approval_probability'),
     path('estimate/',  credit_estimate, name='credit_estimate'),
+    path('assess/',    assess_view,    name='assess'),
+    path('whatif/',    whatif_view,    name='whatif'),
+    path('estimate/batch/', credit_estimate_batch, name='credit_estimate_batch'),
     path('setup/',     user_setup,     name='user_setup'), 
     path('chatbot/', ai_chatbot, name='ai_chatbot'),
     path('insight/', financial_insight, name='financial_insight'), 
+    path('insight/stats/', insight_stats, name='insight_stats'),
     path('history/<str:user_id>/', get_user_history, name='user_history'),
+    path('summary/<str:user_id>/', get_user_summary, name='user_summary'),
+    path('inference/stats/', inference_stats, name='inference_stats'),
+    path('admin/models/', model_versions, name='model_versions'),
 ]
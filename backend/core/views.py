@@ -1,26 +1,119 @@
 # core/views.py
-import os, json
+import asyncio, json, hmac, hashlib, base64, calendar, logging
+import numpy as np
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django.http import (
     JsonResponse,
     HttpResponse,
-    HttpResponseNotAllowed
+    HttpResponseNotAllowed,
+    StreamingHttpResponse
+)
+from .models_mongo import UserProfile, Prediction, Features, UserSummary
+from .registry import get_registry, ModelVersionError
+from .cache import PredictionCache, CoalescingCache
+from .persistence import WriteBehindQueue
+from .gemini import get_gemini_client, GeminiError
+from .metrics import render as render_metrics, stage
+from .schema import APPLICANT, FEATURE_FIELDS, SchemaError
+from .jsonio import FastJsonResponse, loads as json_loads
+from .compression import compress_large
+from . import db
+from .auth import (
+    REFRESH, TokenError, decode_token, hash_password, issue_tokens,
+    resolve_user_id, verify_password
 )
-import joblib
-import pandas as pd
-import requests
-from .models_mongo import UserProfile, Prediction, Features
 from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+
+logger = logging.getLogger(__name__)
+
+# — models are served from the active registry version; see core/registry.py —
+registry = get_registry()
+
+# — repeated feature sets (the app re-submits the same form a lot) skip the forests;
+#   a version swap moves the cache to the new version and drops old outputs —
+prediction_cache = PredictionCache(
+    maxsize=settings.PREDICTION_CACHE_SIZE,
+    ttl=settings.PREDICTION_CACHE_TTL
+)
+registry.add_listener(lambda version: prediction_cache.set_version(version.label))
+
+# — /api/insight/ prompts are deterministic per profile: cache replies by prompt
+#   hash and let simultaneous identical requests share one Gemini call —
+insight_cache = CoalescingCache(
+    maxsize=settings.INSIGHT_CACHE_SIZE,
+    ttl=settings.INSIGHT_CACHE_TTL
+)
+
+# — estimates are stored write-behind: the response doesn't wait on MongoDB;
+#   each written batch is folded into the users' summaries —
+prediction_writer = WriteBehindQueue(
+    Prediction,
+    batch_size=settings.PREDICTION_WRITE_BATCH_SIZE,
+    flush_interval=settings.PREDICTION_WRITE_FLUSH_SECONDS,
+    max_pending=settings.PREDICTION_WRITE_MAX_PENDING,
+    max_retries=settings.PREDICTION_WRITE_MAX_RETRIES,
+    dead_letter_path=settings.PREDICTION_DEAD_LETTER_PATH,
+    on_written=UserSummary.apply_predictions
+)
+
+# upper bound on rows accepted by /api/estimate/batch/ in one request
+ESTIMATE_BATCH_MAX_ROWS = getattr(settings, 'ESTIMATE_BATCH_MAX_ROWS', 50000)
+# upper bound on grid points in one /api/whatif/ surface
+WHATIF_MAX_POINTS = getattr(settings, 'WHATIF_MAX_POINTS', 20000)
+
+
+def _predict_limit(version, x):
+    # concurrent requests share one batched forest walk via the version's batcher
+    return prediction_cache.get_or_compute(
+        'limit', x, lambda: float(version.limit_batcher.submit(x)), version=version.label
+    )
+
+
+# percentiles of the per-tree limits reported by ?intervals=1
+LIMIT_INTERVAL_PERCENTILES = (10, 50, 90)
+
 
-# — point this at your MLModel folder —
-MODEL_DIR = os.path.join(settings.BASE_DIR, 'core', 'MLModel')
+def _wants_intervals(request):
+    return request.GET.get('intervals') in ('1', 'true')
+
+
+def _predict_limit_interval(version, x):
+    # one traversal gives every tree's leaf value: the mean is the usual
+    # prediction and the spread across trees is the interval
+    def compute():
+        stats = version.forests['limit'].predict_interval(x, LIMIT_INTERVAL_PERCENTILES)
+        return {name: float(values[0]) for name, values in stats.items()}
+    return prediction_cache.get_or_compute('limit-interval', x, compute, version=version.label)
+
+
+def _interval_payload(stats):
+    return {name: round(value, 2) for name, value in stats.items() if name != 'mean'}
+
+
+def _predict_approval(version, x):
+    return prediction_cache.get_or_compute(
+        'approval', x, lambda: float(version.approval_batcher.submit(x)), version=version.label
+    )
+
+
+def _as_bool(value):
+    # accept the "Yes"/"No" strings used in credit.csv as well as JSON booleans
+    if isinstance(value, str):
+        return value.strip().lower() in ('yes', 'true', '1', 'y')
+    return bool(value)
+
+
+def _invalid_applicant(e):
+    """400 naming every field of the applicant that failed validation."""
+    return FastJsonResponse({'error': f'Invalid applicant: {e}', 'fields': e.errors}, status=400)
 
-# — load once at startup —
-credit_model        = joblib.load(os.path.join(MODEL_DIR, 'credit_limit_model.pkl'))
-credit_preprocessor = joblib.load(os.path.join(MODEL_DIR, 'limit_preprocessor.pkl'))
-approval_model      = joblib.load(os.path.join(MODEL_DIR, 'approval_model.pkl'))
-approval_preprocessor = joblib.load(os.path.join(MODEL_DIR, 'approval_preprocessor.pkl'))
 
 def index(request):
     return JsonResponse({
@@ -31,12 +124,13 @@ def index(request):
             '/signin/ - User authentication',
             '/setup/ - Complete user profile',
             '/estimate/ - Get credit estimate',
+            '/estimate/batch/ - Score many applicants in one request',
             '/history/<user_id>/ - Get user history'
         ]
     })
 
 @csrf_exempt
-def financial_insight(request):
+async def financial_insight(request):
     if request.method != 'POST':
         return JsonResponse({'error': 'Only POST allowed'}, status=405)
 
@@ -62,26 +156,47 @@ def financial_insight(request):
         - Suggested actions to improve credit health
         """
 
-        headers = { "Content-Type": "application/json" }
-        payload = {
-            "contents": [
-                { "parts": [{ "text": prompt }] }
-            ]
-        }
-
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={settings.GEMINI_API_KEY}"
-
-        response = requests.post(url, headers=headers, json=payload)
-        print("🔍 Insight API Response:", response.status_code, response.text)
-
-        result = response.json()
-        message = result['candidates'][0]['content']['parts'][0]['text']
+        key = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        message = await insight_cache.get_or_fetch(
+            key, lambda: get_gemini_client().generate(prompt)
+        )
         return JsonResponse({'reply': message})
 
+    except GeminiError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
+def insight_stats(request):
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    return JsonResponse(insight_cache.stats())
+
+
+def readiness(request):
+    """200 once the models are loaded and MongoDB answers, else 503."""
+    version = registry.loaded()
+    checks = {'models': version is not None}
+    try:
+        db.ping()
+        checks['mongo'] = True
+    except Exception:
+        checks['mongo'] = False
+    return JsonResponse({
+        'ready': all(checks.values()),
+        'checks': checks,
+        'model_version': version.label if version else None
+    }, status=200 if all(checks.values()) else 503)
+
+
+def metrics_view(request):
+    """Prometheus scrape target; see core/metrics.py."""
+    if not settings.METRICS_ENABLED:
+        return JsonResponse({'error': 'Not found'}, status=404)
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 @csrf_exempt
 def limit_view(request):
     if request.method == 'GET':
@@ -93,32 +208,33 @@ def limit_view(request):
         return HttpResponseNotAllowed(['GET','POST'])
 
     try:
-        payload = json.loads(request.body.decode('utf-8'))
-
-        # build a DataFrame with the exact columns the preprocessor expects:
-        df_input = pd.DataFrame([{
-            "Income":    payload.get("Income",    payload.get("income")),
-            "Rating":    payload.get("Rating",    payload.get("rating")),
-            "Cards":     payload.get("Cards",     payload.get("cards")),
-            "Age":       payload.get("Age",       payload.get("age")),
-            "Balance":   payload.get("Balance",   payload.get("balance")),
-            "Ethnicity": payload.get("Ethnicity", payload.get("ethnicity"))
-        }])
-
-        # transform & predict
-        X_proc = credit_preprocessor.transform(df_input)
-        pred   = credit_model.predict(X_proc)[0]
-
-        return JsonResponse({"predicted_limit": round(float(pred), 2)})
-
-    except KeyError as e:
-        # missing one of the required keys
-        return JsonResponse(
-            {"error": f"Missing feature: {e.args[0]}"},
-            status=400
-        )
+        version = registry.active()
+        encoder = version.encoders['limit']
+        with stage('parse'):
+            # only the fields this model uses are required
+            payload = APPLICANT.validate(json_loads(request.body), encoder.columns)
+
+        # encode straight into the column order the preprocessor was fitted on
+        with stage('encode'):
+            X_proc = encoder.encode(payload)
+        if _wants_intervals(request):
+            with stage('predict'):
+                stats = _predict_limit_interval(version, X_proc)
+            return FastJsonResponse({
+                "predicted_limit": round(stats['mean'], 2),
+                "interval": _interval_payload(stats)
+            })
+        with stage('predict'):
+            pred   = _predict_limit(version, X_proc)
+
+        return FastJsonResponse({"predicted_limit": round(float(pred), 2)})
+
+    except SchemaError as e:
+        return _invalid_applicant(e)
+    except json.JSONDecodeError as e:
+        return FastJsonResponse({"error": f"Invalid JSON: {e}"}, status=400)
     except Exception as e:
-        return JsonResponse(
+        return FastJsonResponse(
             {"error": str(e)},
             status=500
         )
@@ -136,45 +252,335 @@ def approval_view(request):
         return HttpResponseNotAllowed(['GET', 'POST'])
 
     try:
-        payload = json.loads(request.body.decode('utf-8'))
-
-        # --- Build a one‐row DataFrame with the exact columns approval_preprocessor expects ---
-        df_input = pd.DataFrame([{
-            "Income":    payload.get("Income",    payload.get("income")),
-            "Rating":    payload.get("Rating",    payload.get("rating")),
-            "Cards":     payload.get("Cards",     payload.get("cards")),
-            "Age":       payload.get("Age",       payload.get("age")),
-            "Balance":   payload.get("Balance",   payload.get("balance")),
-            "Education": payload.get("Education", payload.get("education")),
-            "Student":   payload.get("Student",   payload.get("student")),
-            "Married":   payload.get("Married",   payload.get("married")),
-            "Ethnicity": payload.get("Ethnicity", payload.get("ethnicity"))
-        }])
-
-        # --- Transform and pull out the probability for class ‘1’ ---
-        X_proc      = approval_preprocessor.transform(df_input)
-        probs       = approval_model.predict_proba(X_proc)[0]
-        approval_p  = float(probs[1])
-
-        return JsonResponse({"approval_probability": round(approval_p, 4)})
-
-    except KeyError as e:
-        return JsonResponse({"error": f"Missing feature: {e.args[0]}"}, status=400)
+        version     = registry.active()
+        encoder     = version.encoders['approval']
+        with stage('parse'):
+            payload = APPLICANT.validate(json_loads(request.body), encoder.columns)
+
+        # --- Encode in approval_preprocessor's column order and pull out the probability for class ‘1’ ---
+        with stage('encode'):
+            X_proc  = encoder.encode(payload)
+        with stage('predict'):
+            approval_p = _predict_approval(version, X_proc)
+
+        return FastJsonResponse({"approval_probability": round(approval_p, 4)})
+
+    except SchemaError as e:
+        return _invalid_applicant(e)
+    except json.JSONDecodeError as e:
+        return FastJsonResponse({"error": f"Invalid JSON: {e}"}, status=400)
+    except Exception as e:
+        return FastJsonResponse({"error": str(e)}, status=500)
+
+@csrf_exempt
+def assess_view(request):
+    """Credit score, limit and approval probability from one parse of the applicant.
+
+    The record is encoded once into the union of the three preprocessors'
+    columns (``SharedEncoder``) and each model takes its slice of that vector.
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    try:
+        version = registry.active()
+        with stage('parse'):
+            record = APPLICANT.validate(json_loads(request.body), version.shared_encoder.columns)
+        with stage('encode'):
+            x = version.shared_encoder.encode(record)
+        with stage('predict'):
+            limit, prob, score = prediction_cache.get_or_compute(
+                'assess', x, lambda: tuple(version.assess_batcher.submit(x).tolist()),
+                version=version.label
+            )
+        return FastJsonResponse({
+            'credit_score': round(score, 1),
+            'credit_limit': round(limit, 2),
+            'approval_probability': round(prob, 4),
+            'model_version': version.label
+        })
+
+    except SchemaError as e:
+        return _invalid_applicant(e)
+    except json.JSONDecodeError as e:
+        return FastJsonResponse({'error': f'Invalid JSON: {e}'}, status=400)
+    except Exception as e:
+        return FastJsonResponse({'error': str(e)}, status=500)
+
+def _whatif_axis(spec, columns, categorical):
+    """``(feature, values)`` from ``{"feature", "start", "stop", "step"}`` or ``{"feature", "values"}``.
+
+    Every value is coerced by the feature's ``APPLICANT`` field, so the grid
+    obeys the same types and lower bounds as the base applicant.  Ranges
+    only make sense for numeric features.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError('each entry in vary must be an object')
+    feature = spec.get('feature')
+    if feature not in columns:
+        raise ValueError(f'cannot vary {feature!r}; choose one of: {", ".join(columns)}')
+    if 'values' in spec:
+        values = spec['values']
+        if not isinstance(values, list) or not values:
+            raise ValueError(f'{feature}: values must be a non-empty list')
+    else:
+        if feature in categorical:
+            raise ValueError(f'{feature}: start/stop/step need a numeric feature; list the values instead')
+        start, stop, step = (float(spec[k]) for k in ('start', 'stop', 'step'))
+        if step <= 0 or stop < start:
+            raise ValueError(f'{feature}: need start <= stop and step > 0')
+        if (stop - start) / step + 1 > WHATIF_MAX_POINTS:
+            raise ValueError(f'{feature}: too many points')
+        # stop is inclusive: Balance 0-5000 step 100 gives 51 points
+        values = np.arange(start, stop + step / 2, step).tolist()
+    coerce = APPLICANT.fields[feature].coerce
+    clean = []
+    for value in values:
+        try:
+            clean.append(coerce(value))
+        except ValueError as e:
+            raise ValueError(f'{feature}: {value!r} {e}')
+    return feature, clean
+
+
+@csrf_exempt
+def whatif_view(request):
+    """Limit and approval surfaces over one or two varied features.
+
+    Body: ``{"base": {applicant}, "vary": [{"feature": "Balance", "start": 0,
+    "stop": 5000, "step": 100}, {"feature": "Rating", "values": [...]}]}``.
+    The base applicant is encoded once; the grid is written into copies of
+    that vector column-wise and scored as a single batch per model.
+    Surfaces are indexed ``[i]`` (one axis) or ``[i][j]`` (two axes).
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    try:
+        data = json_loads(request.body)
+        if not isinstance(data, dict):
+            return FastJsonResponse({'error': 'Body must be a JSON object with base and vary'}, status=400)
+        version = registry.active()
+        encoder = version.estimate_encoder
+        base_encoder = encoder.base
+        numeric = dict(base_encoder.numeric)
+        categorical = dict(base_encoder.categorical)
+
+        try:
+            vary = data.get('vary')
+            if not isinstance(vary, list) or not 1 <= len(vary) <= 2:
+                raise ValueError('vary must list one or two features')
+            axes = [_whatif_axis(spec, base_encoder.columns, categorical) for spec in vary]
+            if len({feature for feature, _ in axes}) != len(axes):
+                raise ValueError('vary the same feature only once')
+            shape = tuple(len(values) for _, values in axes)
+            if int(np.prod(shape)) > WHATIF_MAX_POINTS:
+                raise ValueError(f'Grid too large: {int(np.prod(shape))} points (max {WHATIF_MAX_POINTS})')
+
+            base = data.get('base')
+            if not isinstance(base, dict):
+                raise ValueError('base must be an object')
+            x0 = encoder.encode(APPLICANT.validate(base, encoder.columns))
+
+            # every grid point is x0 with the varied columns overwritten
+            X = np.tile(x0, (int(np.prod(shape)), 1))
+            for axis, (feature, values) in enumerate(axes):
+                # broadcast this axis' values along its own dimension of the grid
+                expand = [1] * len(shape)
+                expand[axis] = shape[axis]
+                if feature in numeric:
+                    column = np.asarray(values, dtype=np.float64)
+                    X[:, numeric[feature]] = np.broadcast_to(column.reshape(expand), shape).ravel()
+                else:
+                    table = categorical[feature]
+                    X[:, list(table.values())] = 0.0
+                    hot = np.asarray([table.get(v, -1) for v in values])
+                    hot = np.broadcast_to(hot.reshape(expand), shape).ravel()
+                    known = hot >= 0
+                    X[np.flatnonzero(known), hot[known]] = 1.0
+        except SchemaError as e:
+            return _invalid_applicant(e)
+        except KeyError as e:
+            return FastJsonResponse({'error': f'Missing feature: {e.args[0]}'}, status=400)
+        except (TypeError, ValueError) as e:
+            return FastJsonResponse({'error': str(e)}, status=400)
+
+        inputs = encoder.split(X)
+        limits = version.forests['limit'].predict(inputs['limit'])
+        probs = version.forests['approval'].predict_proba(inputs['approval'])[:, 1]
+
+        return FastJsonResponse({
+            'axes': [{'feature': feature, 'values': values} for feature, values in axes],
+            'credit_limit': np.round(limits, 2).reshape(shape).tolist(),
+            'approval_probability': np.round(probs, 4).reshape(shape).tolist(),
+            'model_version': version.label
+        })
+
+    except json.JSONDecodeError as e:
+        return FastJsonResponse({'error': f'Invalid JSON: {e}'}, status=400)
     except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+        return FastJsonResponse({'error': str(e)}, status=500)
 
     
+def inference_stats(request):
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    version = registry.active()
+    return JsonResponse({
+        'model_version': version.label,
+        'batchers': [
+            version.limit_batcher.stats(),
+            version.approval_batcher.stats(),
+            version.assess_batcher.stats()
+        ],
+        'cache': prediction_cache.stats(),
+        'persistence': prediction_writer.stats()
+    })
+
+
+def _is_admin(request):
+    token = settings.MODEL_ADMIN_TOKEN
+    supplied = request.headers.get('X-Admin-Token', '')
+    return bool(token) and hmac.compare_digest(supplied, token)
+
+
+@csrf_exempt
+def model_versions(request):
+    """Admin: GET lists model versions, POST ``{"version": name}`` activates one."""
+    if not _is_admin(request):
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+
+    if request.method == 'GET':
+        return JsonResponse({
+            'active': registry.active().label,
+            'versions': registry.list()
+        })
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['GET', 'POST'])
+
+    try:
+        data = json.loads(request.body)
+        name = data.get('version')
+        if not name:
+            return JsonResponse({'error': 'version is required'}, status=400)
+
+        version = registry.activate(name)
+        return JsonResponse({
+            'message': 'Model version activated',
+            'active': version.describe()
+        })
+
+    except KeyError:
+        return JsonResponse({'error': f'Unknown model version: {name}'}, status=404)
+    except ModelVersionError as e:
+        # the previous version keeps serving
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+USERS_PAGE_SIZE = getattr(settings, 'USERS_PAGE_SIZE', 100)
+USERS_MAX_PAGE_SIZE = getattr(settings, 'USERS_MAX_PAGE_SIZE', 1000)
+USERS_EXPORT_BATCH_SIZE = getattr(settings, 'USERS_EXPORT_BATCH_SIZE', 1000)
+USERS_PROJECTION = {'email': 1, 'created_at': 1}
+
+
+def _user_row(doc):
+    return {
+        'id': str(doc['_id']),
+        'email': doc['email'],
+        'created_at': doc['created_at'].isoformat()
+    }
+
+
+def _read_users_after(last_id):
+    """The next ``USERS_EXPORT_BATCH_SIZE`` users after ``last_id`` (keyset on ``_id``)."""
+    query = {'_id': {'$gt': last_id}} if last_id is not None else {}
+    return list(
+        UserProfile._get_collection()
+        .find(query, USERS_PROJECTION)
+        .sort('_id', 1)
+        .limit(USERS_EXPORT_BATCH_SIZE)
+    )
+
+
+def _ndjson(docs):
+    return ''.join(json.dumps(_user_row(doc)) + '\n' for doc in docs)
+
+
+async def _export_users():
+    """NDJSON, one chunk per batch of users; each batch is read on a worker thread.
+
+    ASGI servers read an async iterator chunk by chunk.  Given a sync one,
+    Django would drain it into a list before sending the first byte.
+    """
+    last_id = None
+    while True:
+        docs = await sync_to_async(_read_users_after, thread_sensitive=False)(last_id)
+        if not docs:
+            return
+        yield _ndjson(docs)
+        if len(docs) < USERS_EXPORT_BATCH_SIZE:
+            return
+        last_id = docs[-1]['_id']
+
+
+def _export_users_sync():
+    """``_export_users`` for WSGI, which streams sync iterators."""
+    last_id = None
+    while True:
+        docs = _read_users_after(last_id)
+        if not docs:
+            return
+        yield _ndjson(docs)
+        if len(docs) < USERS_EXPORT_BATCH_SIZE:
+            return
+        last_id = docs[-1]['_id']
+
+
 def list_users(request):
-    users = UserProfile.objects.only('id', 'email', 'created_at')
-    data = [{
-        'id': str(user.id),
-        'email': user.email,
-        'created_at': user.created_at.isoformat()
-    } for user in users]
-    return JsonResponse(data, safe=False)
+    """Page through users in ``_id`` order: ``?limit=`` and ``?cursor=<next_cursor>``.
+
+    ``?format=ndjson`` (admin only) streams every user as one JSON object per
+    line, so memory stays flat however large the collection gets.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    if request.GET.get('format') == 'ndjson':
+        if not _is_admin(request):
+            return JsonResponse({'error': 'Forbidden'}, status=403)
+        rows = _export_users() if isinstance(request, ASGIRequest) else _export_users_sync()
+        response = StreamingHttpResponse(rows, content_type='application/x-ndjson')
+        response['Content-Disposition'] = 'attachment; filename="users.ndjson"'
+        return response
+
+    try:
+        limit = _page_size(request, USERS_PAGE_SIZE, USERS_MAX_PAGE_SIZE)
+        query = {}
+        cursor = request.GET.get('cursor')
+        if cursor:
+            if not ObjectId.is_valid(cursor):
+                raise ValueError('Invalid cursor')
+            query['_id'] = {'$gt': ObjectId(cursor)}
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    docs = list(
+        UserProfile._get_collection()
+        .find(query, USERS_PROJECTION)
+        .sort('_id', 1)
+        .limit(limit + 1)
+    )
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    return JsonResponse({
+        'users': [_user_row(doc) for doc in docs],
+        'next_cursor': str(docs[-1]['_id']) if has_more else None
+    })
 
 @csrf_exempt
-def signup_view(request):
+async def signup_view(request):
     if request.method != 'POST':
         return HttpResponseNotAllowed(['POST'])
     
@@ -187,27 +593,28 @@ def signup_view(request):
             return JsonResponse({'error': 'Email and password are required'}, status=400)
             
         # Check if user already exists
-        if UserProfile.objects(email=email).first():
+        if await asyncio.to_thread(lambda: UserProfile.objects(email=email).first()):
             return JsonResponse({'error': 'User already exists'}, status=400)
             
         # Create new user
         user = UserProfile(
             email=email,
-            password=password,  # In production, hash the password
+            password=await hash_password(password),
             created_at=datetime.utcnow()
         )
-        user.save()
+        await asyncio.to_thread(user.save)
         
         return JsonResponse({
             'message': 'User created successfully',
-            'userId': str(user.id)
+            'userId': str(user.id),
+            **issue_tokens(user)
         })
         
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 @csrf_exempt
-def signin_view(request):
+async def signin_view(request):
     if request.method != 'POST':
         return HttpResponseNotAllowed(['POST'])
     
@@ -220,23 +627,43 @@ def signin_view(request):
             return JsonResponse({'error': 'Email and password are required'}, status=400)
             
         # Find user by email
-        user = UserProfile.objects(email=email).first()
+        user = await asyncio.to_thread(lambda: UserProfile.objects(email=email).first())
         
         if not user:
             return JsonResponse({'error': 'User not found'}, status=404)
             
-        # Check password (in production, use proper password hashing)
-        if user.password != password:
+        # hashing is slow on purpose; keep it off the event loop
+        if not await asyncio.to_thread(verify_password, password, user):
             return JsonResponse({'error': 'Invalid password'}, status=401)
             
         return JsonResponse({
             'message': 'Sign in successful',
-            'userId': str(user.id)
+            'userId': str(user.id),
+            **issue_tokens(user)
         })
         
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
+@csrf_exempt
+async def token_refresh(request):
+    """Trade ``{"refresh": ...}`` for a new token pair with current profile claims."""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    try:
+        data = json.loads(request.body)
+        claims = decode_token(data.get('refresh') or '', REFRESH)
+        user = await asyncio.to_thread(lambda: UserProfile.objects(id=claims['sub']).first())
+        if not user:
+            return JsonResponse({'error': 'User not found'}, status=401)
+        return JsonResponse(issue_tokens(user))
+
+    except TokenError as e:
+        return JsonResponse({'error': str(e)}, status=401)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
 @csrf_exempt
 def user_setup(request):
     if request.method != 'POST':
@@ -244,126 +671,422 @@ def user_setup(request):
     
     try:
         data = json.loads(request.body)
-        user_id = data.get('userId')
+        user_id = resolve_user_id(request, data.get('userId'))
         
         if not user_id:
             return JsonResponse({'error': 'User ID is required'}, status=400)
             
-        # Update user profile with additional information
-        user = UserProfile.objects(id=user_id).first()
-        if not user:
+        # Update user profile with additional information (one round trip,
+        # no read of the profile first)
+        profile = {
+            'dependent_count': int(data.get('dependent_count', 0)),
+            'education_level': data.get('education_level', ''),
+            'income_category': data.get('income_category', ''),
+            'marital_status': data.get('marital_status', ''),
+        }
+        updated = UserProfile.objects(id=user_id).update_one(
+            **{f'set__{field}': value for field, value in profile.items()},
+            set__updated_at=datetime.utcnow()
+        )
+        if not updated:
             return JsonResponse({'error': 'User not found'}, status=404)
-            
-        user.dependent_count = int(data.get('dependent_count', 0))
-        user.education_level = data.get('education_level', '')
-        user.income_category = data.get('income_category', '')
-        user.marital_status = data.get('marital_status', '')
-        user.updated_at = datetime.utcnow()
-        user.save()
-        
-        return JsonResponse({
+
+        response = {
             'message': 'User profile updated successfully',
-            'userId': str(user.id)
-        })
+            'userId': user_id
+        }
+        if request.auth_claims:
+            # hand back tokens carrying the new profile claims
+            user = UserProfile(id=user_id, email=request.auth_claims.get('email'), **profile)
+            response.update(issue_tokens(user))
+        return JsonResponse(response)
         
+    except PermissionError as e:
+        return JsonResponse({'error': str(e)}, status=403)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 @csrf_exempt
 def credit_estimate(request):
-    print("=== Received POST on /api/estimate/ ===")
     if request.method != 'POST':
         return HttpResponseNotAllowed(['POST'])
     
     try:
-        data = json.loads(request.body)
-        user_id = data.get('userId', 'test_user_123')
+        with stage('parse'):
+            data = json_loads(request.body)
+            record = APPLICANT.validate(data, FEATURE_FIELDS)
+            user_id = resolve_user_id(request, data.get('userId')) or 'test_user_123'
         
         if not user_id:
-            return JsonResponse({'error': 'User ID is required'}, status=400)
-            
-        # Create features object
-        features = Features(
-            Income=float(data['Income']),
-            Rating=float(data['Rating']),
-            Cards=int(data['Cards']),
-            Age=int(data['Age']),
-            Balance=float(data['Balance']),
-            Education=int(data['Education']),
-            Student=bool(data['Student']),
-            Married=bool(data['Married']),
-            Ethnicity=data.get('Ethnicity', 'Not Specified')
-        )
-        
-        # Get credit limit prediction
-        df_input = pd.DataFrame([{
-            "Income": features.Income,
-            "Rating": features.Rating,
-            "Cards": features.Cards,
-            "Age": features.Age,
-            "Balance": features.Balance,
-            "Ethnicity": features.Ethnicity
-        }])
-        
-        X_proc = credit_preprocessor.transform(df_input)
-        credit_limit = float(credit_model.predict(X_proc)[0])
-        
-        # Get approval probability
-        df_input_approval = pd.DataFrame([{
-            "Income": features.Income,
-            "Rating": features.Rating,
-            "Cards": features.Cards,
-            "Age": features.Age,
-            "Balance": features.Balance,
-            "Education": features.Education,
-            "Student": features.Student,
-            "Married": features.Married,
-            "Ethnicity": features.Ethnicity
-        }])
+            return FastJsonResponse({'error': 'User ID is required'}, status=400)
         
-        X_proc_approval = approval_preprocessor.transform(df_input_approval)
-        approval_prob = float(approval_model.predict_proba(X_proc_approval)[0][1])
+        version = registry.active()
+        with stage('encode'):
+            x_limit = version.encoders['limit'].encode(record)
+            x_approval = version.encoders['approval'].encode(record)
+
+        # Get credit limit prediction and approval probability
+        with stage('predict'):
+            interval = _predict_limit_interval(version, x_limit) if _wants_intervals(request) else None
+            credit_limit = interval['mean'] if interval else _predict_limit(version, x_limit)
+            approval_prob = _predict_approval(version, x_approval)
         
-        # Store prediction
-        prediction = Prediction(
-            userId=user_id,
-            features=features,
-            creditLimit=credit_limit,
-            approvalProbability=approval_prob,
-            createdAt=datetime.utcnow()
-        )
-        prediction.save()
+        # Store prediction (queued; see prediction_writer)
+        with stage('persist'):
+            prediction = Prediction(
+                userId=user_id,
+                features=Features(**record),
+                creditLimit=credit_limit,
+                approvalProbability=approval_prob,
+                modelVersion=version.label,
+                createdAt=datetime.utcnow()
+            )
+            prediction_writer.put(prediction)
         
-        return JsonResponse({
+        response = {
             'credit_limit': round(credit_limit, 2),
             'approval_probability': round(approval_prob, 4)
-        })
+        }
+        if interval:
+            response['credit_limit_interval'] = _interval_payload(interval)
+        return FastJsonResponse(response)
         
+    except SchemaError as e:
+        return _invalid_applicant(e)
+    except json.JSONDecodeError as e:
+        return FastJsonResponse({'error': f'Invalid JSON: {e}'}, status=400)
+    except PermissionError as e:
+        return FastJsonResponse({'error': str(e)}, status=403)
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
+        return FastJsonResponse({'error': str(e)}, status=500)
+
+@csrf_exempt
+def credit_estimate_batch(request):
+    """Score many applicants in one vectorized encode/predict pass.
+
+    Body: ``{"records": [{Income, Rating, ...}, ...], "persist": false,
+    "userId": "..."}`` (a bare JSON array of records is accepted too).
+    Rows that fail validation are reported in place and do not fail the batch.
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    try:
+        data = json_loads(request.body)
+        if isinstance(data, list):
+            data = {'records': data}
+        records = data.get('records') if isinstance(data, dict) else None
+
+        if not isinstance(records, list):
+            return FastJsonResponse({'error': 'records must be a list'}, status=400)
+        if len(records) > ESTIMATE_BATCH_MAX_ROWS:
+            return FastJsonResponse(
+                {'error': f'Batch too large: {len(records)} rows (max {ESTIMATE_BATCH_MAX_ROWS})'},
+                status=400
+            )
+
+        persist = _as_bool(data.get('persist', False))
+        token_user = getattr(request, 'auth_user_id', None)
+        default_user_id = resolve_user_id(request, data.get('userId'))
+
+        # — validate every row, keeping the good ones for a single pass —
+        validator = APPLICANT.compile(FEATURE_FIELDS)
+        results = [None] * len(records)
+        valid_idx, valid_records = [], []
+        to_store = []
+        with stage('parse'):
+            for i, record in enumerate(records):
+                try:
+                    valid_records.append(validator.validate(record))
+                    valid_idx.append(i)
+                except SchemaError as e:
+                    results[i] = {'index': i, 'error': f'Invalid applicant: {e}', 'fields': e.errors}
+
+        if valid_records:
+            version = registry.active()
+            encoder = version.estimate_encoder
+            with stage('encode'):
+                inputs = encoder.split(encoder.encode_many(valid_records))
+            with stage('predict'):
+                limits = version.forests['limit'].predict(inputs['limit'])
+                probs  = version.forests['approval'].predict_proba(inputs['approval'])[:, 1]
+
+            now = datetime.utcnow()
+            for i, clean, limit, prob in zip(valid_idx, valid_records, limits, probs):
+                results[i] = {
+                    'index': i,
+                    'credit_limit': round(float(limit), 2),
+                    'approval_probability': round(float(prob), 4)
+                }
+                if persist:
+                    to_store.append(Prediction(
+                        # a token pins every row to its user
+                        userId=token_user or records[i].get('userId', default_user_id) or 'batch',
+                        features=Features(**clean),
+                        creditLimit=float(limit),
+                        approvalProbability=float(prob),
+                        modelVersion=version.label,
+                        createdAt=now
+                    ))
+
+            if to_store:
+                Prediction.objects.insert(to_store, load_bulk=False)
+                try:
+                    UserSummary.apply_predictions([p.to_mongo() for p in to_store])
+                except Exception:
+                    # the predictions are stored; a 500 here would make a
+                    # retrying client store them twice
+                    logger.exception('summary update failed for %d batch prediction(s)', len(to_store))
+
+        return FastJsonResponse({
+            'results': results,
+            'scored': len(valid_idx),
+            'failed': len(records) - len(valid_idx),
+            'persisted': len(to_store)
+        })
+
+    except json.JSONDecodeError as e:
+        return FastJsonResponse({'error': f'Invalid JSON: {e}'}, status=400)
+    except PermissionError as e:
+        return FastJsonResponse({'error': str(e)}, status=403)
+    except Exception as e:
+        return FastJsonResponse({'error': str(e)}, status=500)
+
+# — /api/history/ pages: newest first, keyset on (createdAt, _id) —
+HISTORY_PAGE_SIZE = getattr(settings, 'HISTORY_PAGE_SIZE', 100)
+HISTORY_MAX_PAGE_SIZE = getattr(settings, 'HISTORY_MAX_PAGE_SIZE', 1000)
+HISTORY_PROJECTION = {'createdAt': 1, 'creditLimit': 1, 'approvalProbability': 1}
+HISTORY_BUCKETS = ('day', 'week', 'month')
+HISTORY_SORT = [('createdAt', -1), ('_id', -1)]
+
+
+def _encode_cursor(doc):
+    """Opaque page cursor: ``<createdAt epoch ms>.<_id hex>``, urlsafe-base64."""
+    millis = calendar.timegm(doc['createdAt'].utctimetuple()) * 1000 + doc['createdAt'].microsecond // 1000
+    return base64.urlsafe_b64encode(f'{millis}.{doc["_id"]}'.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        millis, oid = raw.split('.')
+        created = datetime.utcfromtimestamp(int(millis) / 1000)
+        return created.replace(microsecond=int(millis) % 1000 * 1000), ObjectId(oid)
+    except (ValueError, TypeError, InvalidId, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
 
+
+def _page_size(request, default, maximum):
+    try:
+        limit = int(request.GET.get('limit', default))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, maximum)
+
+
+def _history_buckets(user_id, unit, limit):
+    """Aggregate a user's estimates into UTC day/week/month buckets, newest first.
+
+    Each bucket carries min/max/avg/last of the credit limit and approval
+    probability, so the payload grows with the time span, not the number of
+    estimates.  Weeks start on Monday.
+    """
+    pipeline = [
+        {'$match': {'userId': user_id}},
+        # chronological within a bucket so $last is the bucket's newest estimate
+        {'$sort': {'createdAt': 1, '_id': 1}},
+        {'$group': {
+            '_id': {'$dateTrunc': {'date': '$createdAt', 'unit': unit, 'startOfWeek': 'monday'}},
+            'count': {'$sum': 1},
+            'limitMin': {'$min': '$creditLimit'},
+            'limitMax': {'$max': '$creditLimit'},
+            'limitAvg': {'$avg': '$creditLimit'},
+            'limit': {'$last': '$creditLimit'},
+            'approvalProbabilityMin': {'$min': '$approvalProbability'},
+            'approvalProbabilityMax': {'$max': '$approvalProbability'},
+            'approvalProbabilityAvg': {'$avg': '$approvalProbability'},
+            'approvalProbability': {'$last': '$approvalProbability'},
+        }},
+        {'$sort': {'_id': -1}},
+        {'$limit': limit},
+    ]
+    return [
+        {'date': row.pop('_id').isoformat(), **row}
+        for row in Prediction._get_collection().aggregate(pipeline, allowDiskUse=True)
+    ]
+
+
+def _etag(*parts):
+    return 'W/"%s"' % hashlib.blake2b('|'.join(map(str, parts)).encode(), digest_size=12).hexdigest()
+
+
+def _history_etag(request, user_id):
+    """Weak ETag for a history response, from index-only lookups.
+
+    Predictions are only ever added, so the user's newest one plus their
+    count identify the data; the count catches a batch from another worker
+    landing with an older ``createdAt``.  Both queries are answered from the
+    ``(userId, -createdAt, -_id)`` index without reading a document.  The
+    query string is part of the tag, since every page and bucket size is a
+    different body.  ``None`` (no conditional handling) when the view would
+    refuse the request anyway or Mongo is unreachable; the view reports that.
+    """
+    if request.method != 'GET':
+        return None
+    try:
+        resolve_user_id(request, user_id)
+        predictions = Prediction._get_collection()
+        latest = predictions.find_one({'userId': user_id}, {'_id': 1, 'createdAt': 1}, sort=HISTORY_SORT)
+        if latest is None:
+            return _etag('history', user_id, 'empty', request.GET.urlencode())
+        count = predictions.count_documents({'userId': user_id})
+    except Exception:
+        return None
+    return _etag('history', user_id, latest['_id'], latest['createdAt'].isoformat(), count,
+                 request.GET.urlencode())
+
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_history_etag)
+@compress_large
 def get_user_history(request, user_id):
+    """One page of a user's estimates, newest first.
+
+    ``?limit=`` sets the page size and ``?cursor=`` continues from a previous
+    page's ``next_cursor`` (``null`` on the last page).  ``latest`` comes from
+    the same query, so it is only filled on the first page.
+
+    ``?bucket=day|week|month`` returns the ``limit`` most recent buckets
+    instead of raw estimates (see ``_history_buckets``); ``history[].limit``
+    is then the last credit limit in each bucket.
+    """
     if request.method != 'GET':
         return HttpResponseNotAllowed(['GET'])
     
     try:
-        predictions = Prediction.objects(userId=user_id).order_by('-createdAt')
+        try:
+            resolve_user_id(request, user_id)
+        except PermissionError as e:
+            return JsonResponse({'error': str(e)}, status=403)
+        try:
+            limit = _page_size(request, HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE)
+            cursor = request.GET.get('cursor')
+            bucket = request.GET.get('bucket')
+            if bucket is not None:
+                if bucket not in HISTORY_BUCKETS:
+                    raise ValueError(f'bucket must be one of: {", ".join(HISTORY_BUCKETS)}')
+                if cursor:
+                    raise ValueError('cursor cannot be combined with bucket')
+            query = {'userId': user_id}
+            if cursor:
+                created, oid = _decode_cursor(cursor)
+                query['$or'] = [
+                    {'createdAt': {'$lt': created}},
+                    {'createdAt': created, '_id': {'$lt': oid}}
+                ]
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        if bucket:
+            buckets = _history_buckets(user_id, bucket, limit)
+            return JsonResponse({
+                'bucket': bucket,
+                'history': buckets,
+                # the newest bucket's last values are the latest estimate
+                'latest': {
+                    'creditLimit': buckets[0]['limit'],
+                    'approvalProbability': buckets[0]['approvalProbability']
+                } if buckets else None,
+                'next_cursor': None
+            })
+
+        # raw documents with only the charted fields; one extra row tells us
+        # whether there is another page
+        docs = list(
+            Prediction._get_collection()
+            .find(query, HISTORY_PROJECTION)
+            .sort(HISTORY_SORT)
+            .limit(limit + 1)
+        )
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+
         history = [{
-            'date': pred.createdAt.isoformat(),
-            'limit': pred.creditLimit
-        } for pred in predictions]
-        
-        latest = predictions.first()
+            'date': doc['createdAt'].isoformat(),
+            'limit': doc['creditLimit'],
+            'approvalProbability': doc['approvalProbability']
+        } for doc in docs]
+
         latest_data = {
-            'creditLimit': latest.creditLimit,
-            'approvalProbability': latest.approvalProbability
-        } if latest else None
+            'creditLimit': docs[0]['creditLimit'],
+            'approvalProbability': docs[0]['approvalProbability']
+        } if docs and not cursor else None
         
         return JsonResponse({
             'history': history,
-            'latest': latest_data
+            'latest': latest_data,
+            'next_cursor': _encode_cursor(docs[-1]) if has_more else None
         })
         
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+SUMMARY_FIELDS = (
+    'estimateCount', 'latestCreditLimit', 'latestApprovalProbability',
+    'minCreditLimit', 'maxCreditLimit', 'firstEstimateAt', 'latestEstimateAt'
+)
+
+
+def _summary_etag(request, user_id):
+    """Weak ETag for a summary response: its ``estimateCount``/``latestEstimateAt``.
+
+    Taken from the summary document rather than the newest prediction:
+    summaries are upserted after the predictions are written, so a tag from
+    the predictions could be paired with the previous summary and pin it.
+    """
+    if request.method != 'GET':
+        return None
+    try:
+        resolve_user_id(request, user_id)
+        doc = UserSummary._get_collection().find_one(
+            {'userId': user_id}, {'estimateCount': 1, 'latestEstimateAt': 1}
+        )
+    except Exception:
+        return None
+    if doc is None:
+        return None
+    return _etag('summary', user_id, doc.get('estimateCount'), doc.get('latestEstimateAt'))
+
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_summary_etag)
+@compress_large
+def get_user_summary(request, user_id):
+    """Latest limit/probability, estimate count and limit range from ``user_summaries``."""
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    try:
+        resolve_user_id(request, user_id)
+    except PermissionError as e:
+        return JsonResponse({'error': str(e)}, status=403)
+
+    try:
+        doc = UserSummary._get_collection().find_one(
+            {'userId': user_id}, {field: 1 for field in SUMMARY_FIELDS}
+        )
+        if doc is None:
+            return JsonResponse({'error': 'No estimates for this user'}, status=404)
+
+        summary = {'userId': user_id}
+        for field in SUMMARY_FIELDS:
+            value = doc.get(field)
+            summary[field] = value.isoformat() if isinstance(value, datetime) else value
+        return JsonResponse(summary)
+
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)# views.py
 # from django.http import JsonResponse
@@ -401,8 +1124,38 @@ def get_user_history(request, user_id):
 #             return JsonResponse({'error': str(e)}, status=400)
 
 
+def _wants_stream(request, data):
+    # new app versions opt in; older ones keep getting {'reply': ...}
+    return (
+        request.GET.get('stream') in ('1', 'true')
+        or data.get('stream') is True
+        or 'text/event-stream' in request.headers.get('Accept', '')
+    )
+
+
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+async def _chatbot_event_stream(prompt):
+    """Relay Gemini chunks as Server-Sent Events.
+
+    If the client disconnects, Django cancels this generator; the upstream
+    stream is closed as the cancellation unwinds through ``stream()``.
+    """
+    stream = get_gemini_client().stream(prompt)
+    try:
+        async for text in stream:
+            yield _sse('chunk', {'text': text})
+        yield _sse('done', {})
+    except GeminiError as e:
+        yield _sse('error', {'error': str(e), 'status': e.status})
+    finally:
+        await stream.aclose()
+
+
 @csrf_exempt
-def ai_chatbot(request):
+async def ai_chatbot(request):
     if request.method != 'POST':
         return JsonResponse({'error': 'Only POST allowed'}, status=405)
 
@@ -427,29 +1180,19 @@ def ai_chatbot(request):
         Provide the best possible financial advice.
         """
 
-        payload = {
-            "contents": [
-                {
-                    "parts": [{"text": prompt}]
-                }
-            ]
-        }
-
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={settings.GEMINI_API_KEY}"
-
-        response = requests.post(
-            url,
-            headers={"Content-Type": "application/json"},
-            json=payload
-        )
+        if _wants_stream(request, data):
+            response = StreamingHttpResponse(
+                _chatbot_event_stream(prompt),
+                content_type='text/event-stream'
+            )
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'  # don't let a proxy buffer the stream
+            return response
 
-        print("🔁 Gemini raw response:", response.status_code, response.text)
-
-        result = response.json()
-        message = result['candidates'][0]['content']['parts'][0]['text']
+        message = await get_gemini_client().generate(prompt)
         return JsonResponse({'reply': message})
 
+    except GeminiError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
-
-
@@ -0,0 +1,18 @@
+# gunicorn.conf.py
+# gunicorn -c gunicorn.conf.py banking_backend.asgi:application
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# import the app in the master: the models are loaded, verified and warmed
+# once (core/startup.py) and every forked worker inherits them
+preload_app = True
+
+
+def post_fork(server, worker):
+    # MongoDB clients must not cross a fork; the master never queries, but
+    # make sure each worker starts without an inherited client
+    from core import db
+    db.reset()